@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from statistics import median
+import simpy
+from .constants import SimConfig
+from .tesla import build_cell, cost_sim
+
+
+
+#Directory that holds the package, so fresh interpreters can import it
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PACKAGE = __package__ or os.path.basename(os.path.dirname(os.path.abspath(__file__)))
+
+_TIMED_IMPORT = 'import time; start = time.perf_counter(); import {0}; print(time.perf_counter() - start)'
+
+
+def _python(*args):
+	return subprocess.run([sys.executable] + list(args), cwd=_ROOT, capture_output=True, text=True, check=True)
+
+
+class Startup_Result(object):
+	#Cold-start cost of importing a module in a fresh interpreter, as paid by every spawned worker. `imports`
+	#	lists the slowest modules by cumulative import time in seconds, from `python -X importtime`.
+
+	def __init__(self, module, times, imports):
+		self.module = module
+		self.times = times
+		self.median = median(times)
+		self.imports = imports
+
+	def print_out(self):
+		print('Importing {0}: median {1:.1f}ms over {2} fresh interpreters (min {3:.1f}ms, max {4:.1f}ms)'.format(
+			self.module, self.median * 1000, len(self.times), min(self.times) * 1000, max(self.times) * 1000))
+		print('Slowest imports (cumulative):')
+		for name, seconds in self.imports:
+			print('\t{0:<40} {1:7.1f}ms'.format(name, seconds * 1000))
+
+
+def startup_benchmark(module='tesla', runs=10, top=10):
+	#Times `import <package>.<module>` in `runs` fresh interpreters and breaks one of them down by module
+	name = '{0}.{1}'.format(_PACKAGE, module)
+	times = [float(_python('-c', _TIMED_IMPORT.format(name)).stdout) for i in range(runs)]
+	report = _python('-X', 'importtime', '-c', 'import {0}'.format(name)).stderr
+	imports = []
+	for line in report.splitlines():
+		fields = line.split('|')
+		if len(fields) == 3 and fields[1].strip().isdigit():
+			imports.append((fields[2].strip(), int(fields[1]) / 1e6))
+	imports = sorted(imports, key=lambda item: item[1], reverse=True)[:top]
+	return Startup_Result(name, times, imports)
+
+
+class Counting_Environment(simpy.Environment):
+	#Environment that counts the events it processes, for the events/s figures. Only the untimed run uses it,
+	#	so the timed runs keep the plain `simpy.Environment`.
+
+	def __init__(self, initial_time=0):
+		super().__init__(initial_time)
+		self.events = 0
+
+	def step(self):
+		super().step()
+		self.events += 1
+
+
+def time_main(config=None, seed=None, repeats=3):
+	#Times `repeats` full runs of the cell and reports the fastest: simulated seconds per wall-second and
+	#	events per second. The peak Python memory and the event count of one more run are measured with
+	#	tracemalloc and a `Counting_Environment`, which slow it down too much to time it.
+	if config is None:
+		config = SimConfig()
+	walls = []
+	for i in range(repeats):
+		cell = build_cell(config, seed)
+		start = time.perf_counter()
+		cell.run()
+		walls.append(time.perf_counter() - start)
+	tracemalloc.start()
+	cell = build_cell(config, seed, env=Counting_Environment())
+	cell.run()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	events = cell.env.events
+	wall = min(walls)
+	return {
+		'simulation_time': config.SIMULATION_TIME,
+		'wall_seconds': wall,
+		'wall_seconds_median': median(walls),
+		'events': events,
+		'sim_seconds_per_wall_second': config.SIMULATION_TIME / wall,
+		'events_per_second': events / wall,
+		'peak_memory_bytes': peak,
+	}
+
+
+def _time_cost_sim(steps, workers, config, seed, min_cycle, max_cycle, repeats):
+	#Fastest of `repeats` runs of a `cost_sim()` sweep with no plot and its printout suppressed
+	walls = []
+	for i in range(repeats):
+		start = time.perf_counter()
+		with redirect_stdout(io.StringIO()):
+			cost_sim(min_cycle, max_cycle, steps, workers=workers, seed=seed, config=config, plot=False)
+		walls.append(time.perf_counter() - start)
+	return min(walls)
+
+
+def time_sweep(steps=40, workers=1, config=None, seed=None, min_cycle=45, max_cycle=131, repeats=3):
+	#Wall time of a `steps` point `cost_sim()` sweep and the time per point, each the best of `repeats`. A sweep
+	#	of one point per worker is timed the same way, and `seconds_per_point` is the marginal cost of the points
+	#	beyond it, so pool start-up and worker imports (`fixed_seconds`) don't count towards it.
+	wall = _time_cost_sim(steps, workers, config, seed, min_cycle, max_cycle, repeats)
+	base = _time_cost_sim(workers, workers, config, seed, min_cycle, max_cycle, repeats)
+	per_point = max(0.0, wall - base) / (steps - workers)
+	return {'steps': steps, 'workers': workers, 'wall_seconds': wall, 'fixed_seconds': max(0.0, wall - per_point * steps),
+			'seconds_per_point': per_point}
+
+
+def run_benchmarks(quick=False, simulation_times=(12500, 25000, 50000, 100000, 200000), workers=(1, 2, 4),
+				   routers=(1, 2, 3, 4), steps=40):
+	#The full suite: `main()` throughput for the default config, scaling with `SIMULATION_TIME` and router
+	#	count, and sweep latency for each worker count. `quick` trims every axis for a fast smoke run.
+	if quick:
+		simulation_times, workers, routers, steps = simulation_times[:2], workers[:2], routers[-1:], 16
+	config = SimConfig()
+	return {
+		'machine': {
+			'python': platform.python_version(),
+			'platform': platform.platform(),
+			'cpus': os.cpu_count(),
+			'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+		},
+		'main': time_main(config),
+		'simulation_time': [time_main(config.replace(SIMULATION_TIME=t), repeats=1) for t in simulation_times],
+		'routers': [dict(time_main(config.replace(ROUTERS=r), repeats=1), routers=r) for r in routers],
+		'sweep': [time_sweep(steps, w) for w in workers],
+	}
+
+
+def save_benchmarks(results, path):
+	with open(path, 'w') as f:
+		json.dump(results, f, indent=2)
+
+
+def compare_benchmarks(results, baseline, tolerance=0.1):
+	#Throughput figures in `results` that fell more than `tolerance` below `baseline` (dicts from
+	#	`run_benchmarks()`, or paths to saved ones), as (name, baseline, result) tuples
+	if isinstance(baseline, str):
+		with open(baseline) as f:
+			baseline = json.load(f)
+	if isinstance(results, str):
+		with open(results) as f:
+			results = json.load(f)
+	regressions = []
+	for key in ('sim_seconds_per_wall_second', 'events_per_second'):
+		if results['main'][key] < baseline['main'][key] * (1 - tolerance):
+			regressions.append(('main ' + key, baseline['main'][key], results['main'][key]))
+	for old, new in zip(baseline['sweep'], results['sweep']):
+		if old['workers'] == new['workers'] and new['seconds_per_point'] > old['seconds_per_point'] * (1 + tolerance):
+			regressions.append(('sweep seconds_per_point, {0} workers'.format(new['workers']), old['seconds_per_point'], new['seconds_per_point']))
+	return regressions
+
+
+def print_benchmarks(results):
+	main = results['main']
+	print('main(): {0:.3f}s for {1}s simulated, {2:.0f} sim-s/s, {3} events, {4:.0f} events/s, peak {5:.1f}MB'.format(
+		main['wall_seconds'], main['simulation_time'], main['sim_seconds_per_wall_second'], main['events'],
+		main['events_per_second'], main['peak_memory_bytes'] / 1e6))
+	print('Scaling with SIMULATION_TIME:')
+	for run in results['simulation_time']:
+		print('\t{0:>8}s  {1:7.3f}s  {2:8.0f} events/s  peak {3:.1f}MB'.format(run['simulation_time'], run['wall_seconds'],
+			run['events_per_second'], run['peak_memory_bytes'] / 1e6))
+	print('Scaling with ROUTERS:')
+	for run in results['routers']:
+		print('\t{0:>8}   {1:7.3f}s  {2:8.0f} events/s'.format(run['routers'], run['wall_seconds'], run['events_per_second']))
+	print('Sweeps:')
+	for sweep in results['sweep']:
+		print('\t{0} workers  {1} points in {2:.2f}s, {3:.3f}s per point after {4:.2f}s fixed cost'.format(sweep['workers'],
+			sweep['steps'], sweep['wall_seconds'], sweep['seconds_per_point'], sweep.get('fixed_seconds', 0.0)))
+	if 'startup' in results:
+		print('Cold import: {0:.1f}ms'.format(results['startup'] * 1000))
+
+
+if __name__ == '__main__':
+	import argparse
+	parser = argparse.ArgumentParser(description='Benchmark the work cell simulation')
+	parser.add_argument('--output', help='write the results to this JSON file')
+	parser.add_argument('--baseline', help='fail if throughput regressed against this JSON file')
+	parser.add_argument('--tolerance', type=float, default=0.1)
+	parser.add_argument('--quick', action='store_true', help='trim every axis for a fast smoke run')
+	parser.add_argument('--startup', action='store_true', help='only measure import time')
+	args = parser.parse_args()
+	if args.startup:
+		startup_benchmark().print_out()
+		sys.exit()
+	results = run_benchmarks(quick=args.quick)
+	results['startup'] = startup_benchmark(runs=5).median
+	print_benchmarks(results)
+	if args.output:
+		save_benchmarks(results, args.output)
+	if args.baseline:
+		regressions = compare_benchmarks(results, args.baseline, args.tolerance)
+		for name, old, new in regressions:
+			print('REGRESSION {0}: {1:.4g} -> {2:.4g}'.format(name, old, new))
+		sys.exit(1 if regressions else 0)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from .topology import compile_topology
+
+
+
+#Bump when the model changes in a way the source hash in `model_version()` can't see
+CACHE_VERSION = 1
+#Modules whose source goes into `model_version()`, so editing the model drops stale results
+MODEL_SOURCES = ('constants.py', 'equipment.py', 'topology.py', 'tesla.py', 'replication.py', 'steady_state.py')
+#Default cache file, overridden by the TESLA_CACHE environment variable
+DEFAULT_PATH = os.path.join('~', '.cache', 'tesla', 'results.sqlite')
+
+
+def model_version():
+	#Hash of `CACHE_VERSION` and the model source; cached results from any other version are discarded
+	digest = hashlib.sha256(str(CACHE_VERSION).encode())
+	directory = os.path.dirname(os.path.abspath(__file__))
+	for name in MODEL_SOURCES:
+		with open(os.path.join(directory, name), 'rb') as f:
+			digest.update(f.read())
+	return digest.hexdigest()
+
+
+def point_key(config, seed, replications=1, precision=0.01, topology=None, steady_state=False):
+	#Hash of everything that determines a `run_point()` result: every constant in `config` (the horizon
+	#	`SIMULATION_TIME` included), the point's seed, the topology and how the point is scored
+	params = {
+		'config': config.as_dict(),
+		'seed': seed,
+		'topology': compile_topology(topology).fingerprint,
+		'replications': replications,
+		'precision': precision if replications > 1 else None,
+		'steady_state': steady_state,
+	}
+	return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def _dump(setting):
+	return json.dumps(vars(setting), default=float)
+
+
+def _load(value):
+	from .tesla import Setting
+	setting = Setting.__new__(Setting)
+	setting.__dict__.update(json.loads(value))
+	return setting
+
+
+class Result_Cache(object):
+	#Scored sweep points kept in an SQLite file between sessions, keyed by `point_key()`. Each lookup marks the
+	#	entry as used, and the least recently used entries are evicted once there are more than `max_entries`.
+	#	The whole cache is emptied when it was written by a different `model_version()`.
+
+	def __init__(self, path=None, max_entries=100000):
+		if path is None:
+			path = os.path.expanduser(os.environ.get('TESLA_CACHE', DEFAULT_PATH))
+		directory = os.path.dirname(os.path.abspath(path))
+		os.makedirs(directory, exist_ok=True)
+		self.path = path
+		self.max_entries = max_entries
+		self.hits = 0
+		self.misses = 0
+		self.db = sqlite3.connect(path)
+		self.db.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+		self.db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, used REAL)')
+		self.db.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+		version = model_version()
+		row = self.db.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+		if row is None or row[0] != version:
+			self.db.execute('DELETE FROM results')
+			self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+		self.db.commit()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	def __len__(self):
+		return self.db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+	key = staticmethod(point_key)
+
+	def get(self, key):
+		return self.get_many([key])[0]
+
+	def get_many(self, keys):
+		#Cached `Setting` for each key, or None where there is no entry
+		settings = []
+		now = time.time()
+		for key in keys:
+			row = self.db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+			if row is None:
+				self.misses += 1
+				settings.append(None)
+			else:
+				self.hits += 1
+				self.db.execute('UPDATE results SET used = ? WHERE key = ?', (now, key))
+				settings.append(_load(row[0]))
+		self.db.commit()
+		return settings
+
+	def put(self, key, setting):
+		self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?)', (key, _dump(setting), time.time()))
+		self.evict()
+		self.db.commit()
+
+	def evict(self):
+		self.db.execute('DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)',
+						(self.max_entries,))
+
+	def clear(self):
+		self.db.execute('DELETE FROM results')
+		self.db.commit()
+
+	def close(self):
+		self.db.close()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+import argparse
+import ast
+import sys
+from .constants import G, SimConfig
+from .results import Results_Table, load_results, merge_results
+from .tesla import cost_sim
+
+
+
+def parse_shard(text):
+	#'i/N' -> (i, N), with 0 <= i < N
+	try:
+		index, count = (int(part) for part in text.split('/'))
+	except ValueError:
+		raise argparse.ArgumentTypeError('shard must look like i/N, e.g. 0/4')
+	if count < 1 or not 0 <= index < count:
+		raise argparse.ArgumentTypeError('shard index must be in 0..N-1')
+	return index, count
+
+
+def parse_setting(text):
+	#'NAME=VALUE' -> (NAME, VALUE), with VALUE read as a Python literal where it is one
+	name, sep, value = text.partition('=')
+	if not sep:
+		raise argparse.ArgumentTypeError('settings must look like NAME=VALUE')
+	try:
+		value = ast.literal_eval(value)
+	except (ValueError, SyntaxError):
+		pass
+	return name.strip(), value
+
+
+def sweep(args):
+	try:
+		config = SimConfig(**dict(args.set))
+	except TypeError as error:
+		sys.exit(str(error))
+	if args.steady_state and args.replications > 1:
+		sys.exit('--steady-state runs one run per point, so it can\'t be combined with --replications')
+	cache = None
+	if args.cache is not None:
+		from .cache import Result_Cache
+		cache = Result_Cache(args.cache or None)
+	table = Results_Table(capacity=args.steps)
+	best_setting = cost_sim(args.min_cycle, args.max_cycle, args.steps, workers=args.workers, seed=args.seed, config=config,
+							replications=args.replications, precision=args.precision, steady_state=args.steady_state,
+							cache=cache, screen_margin=args.screen_margin, plot=args.plot or False, table=table, shard=args.shard,
+							race=False if args.no_race else None)
+	if cache is not None:
+		cache.close()
+	if args.output:
+		table.to_npz(args.output)
+		print('Wrote {0} points to {1}'.format(len(table), args.output))
+	return best_setting
+
+
+def merge(args):
+	table = merge_results([load_results(path) for path in args.inputs])
+	print('Merged {0} points from {1} files'.format(len(table), len(args.inputs)))
+	if args.output:
+		table.to_npz(args.output)
+	if args.csv:
+		table.to_csv(args.csv)
+	best_setting = table.setting(table.best())
+	best_setting.print_out()
+	return best_setting
+
+
+def build_parser():
+	parser = argparse.ArgumentParser(prog='python -m tesla.cli', description='Run and combine work cell cycle time sweeps')
+	commands = parser.add_subparsers(dest='command', required=True)
+
+	run = commands.add_parser('sweep', help='run a sweep, or one shard of it')
+	run.add_argument('--min-cycle', type=float, default=45)
+	run.add_argument('--max-cycle', type=float, default=G.THERMOFORMER_RUNTIME)
+	run.add_argument('--steps', type=int, default=100)
+	run.add_argument('--replications', type=int, default=1)
+	run.add_argument('--precision', type=float, default=0.01)
+	run.add_argument('--workers', type=int, default=1)
+	run.add_argument('--seed', type=int, default=None)
+	run.add_argument('--steady-state', action='store_true')
+	run.add_argument('--screen-margin', type=float, default=None)
+	run.add_argument('--no-race', action='store_true',
+					 help='replicate every point to --precision, as sharded sweeps do, rather than racing the points')
+	run.add_argument('--set', type=parse_setting, action='append', default=[], metavar='NAME=VALUE',
+					 help='override a constant from constants.py, e.g. --set ROUTERS=4; may be repeated')
+	run.add_argument('--shard', type=parse_shard, default=None, metavar='i/N',
+					 help='run only shard i (0-based) of N; every host must use the same sweep arguments')
+	run.add_argument('--cache', nargs='?', const='', default=None, metavar='PATH',
+					 help='reuse and store points in a result cache (default location without PATH)')
+	run.add_argument('--output', help='write the scored points to this .npz file')
+	run.add_argument('--plot', help='write the sweep figure to this file')
+	run.set_defaults(handler=sweep)
+
+	combine = commands.add_parser('merge', help='combine shard result files into one table')
+	combine.add_argument('inputs', nargs='+')
+	combine.add_argument('--output', help='write the merged table to this .npz file')
+	combine.add_argument('--csv', help='also write the merged table as CSV')
+	combine.set_defaults(handler=merge)
+	return parser
+
+
+def main(argv=None):
+	args = build_parser().parse_args(argv)
+	args.handler(args)
+
+
+if __name__ == '__main__':
+	main()
@@ -1,8 +1,5 @@
 #!/usr/bin/env python3
 
-from numpy.random import seed
-
-
 
 class G:
 	#Class to store constants of which are unique to this simulation
@@ -10,17 +7,24 @@ class G:
 	#Environment constants
 	SIMULATION_TIME = 50000
 	EAU = 120000
-	seed(seed=10)
+	SEED = 10
+	COMMON_RANDOM_NUMBERS = False		#one random stream per piece of equipment, see `Common_Streams`
 	USER_INPUT = False
 	
 	#Operator constants
 	MAIN_OPERATORS = 1
 	SUPPORT_OPERATORS = 2
 	
+	#Equipment counts
+	SHEETERS = 1
+	ROUTERS = 3
+	
 	#Equipment constants
 	SHEETER_RUNTIME = 22.61
 	SHEETER_RUNTIME_STDEV = 0.67
 	SHEETER_YIELD = 1
+	SHEETER_MTBF = 0					#mean s between breakdowns, 0 = never breaks down
+	SHEETER_MTTR = 0					#mean s to repair
 	
 	ROUTER_CAPACITY = 1
 	ROUTER_RUNTIME = 91.29
@@ -30,6 +34,8 @@ class G:
 	ROUTER_UNLOAD_TIME = 17.43
 	ROUTER_UNLOAD_TIME_STDEV = 5.46
 	ROUTER_YIELD = 1
+	ROUTER_MTBF = 0
+	ROUTER_MTTR = 0
 	
 	LOAD_STATION_LOAD_TIME = 15
 	LOAD_STATION_LOAD_TIME_STDEV = 1.02
@@ -40,6 +46,8 @@ class G:
 	THERMOFORMER_YIELD = 1
 	THERMOFORMER_RUNTIME = 131
 	THERMOFORMER_RUNTIME_STDEV = 0.50
+	THERMOFORMER_MTBF = 0
+	THERMOFORMER_MTTR = 0
 	
 	SPLITTER_CAPACITY = 1
 	SPLITTER_RUNTIME = 8.58
@@ -50,11 +58,15 @@ class G:
 	TRIMMER_RUNTIME = 24.29
 	TRIMMER_RUNTIME_STDEV = 4.30
 	TRIMMER_YIELD = 1
+	TRIMMER_MTBF = 0
+	TRIMMER_MTTR = 0
 	
 	DRILLER_CAPACITY = 1
 	DRILLER_RUNTIME = 11.97
 	DRILLER_RUNTIME_STDEV = 2.58
 	DRILLER_YIELD = 1
+	DRILLER_MTBF = 0
+	DRILLER_MTTR = 0
 	
 	BOX_BUILDTIME = 15
 	BOX_BUILDTIME_STDEV = 2
@@ -77,4 +89,76 @@ class G:
 	BOX_COST = .51675 					#USD/part
 	OPERATOR_RATE = 18.00 			#USD/hr
 	MACHINE_RATE = 14.78 				#USD/hr
-	OVERHEAD_RATE = 19.4964 		#USD/hr
\ No newline at end of file
+	OVERHEAD_RATE = 19.4964 		#USD/hr
+
+
+#Values worked out once per run from the constants above
+DERIVED_FIELDS = ('SIMULATION_HOURS', 'LABOR_RATE', 'RUN_LABOR_COST', 'UNIT_MATERIAL_COST')
+CONFIG_FIELDS = tuple(name for name in vars(G) if name.isupper())
+
+
+def _make_config(values):
+	#Unpickling hook for `SimConfig`; its slots can't be filled through the normal `__setstate__`
+	return SimConfig(**values)
+
+
+class SimConfig(object):
+	#Immutable snapshot of the constants in `G` for a single run. `main()` and every piece of equipment
+	#	read their parameters from one of these, so several configurations can run side by side.
+	__slots__ = CONFIG_FIELDS + DERIVED_FIELDS
+	
+	def __init__(self, **overrides):
+		unknown = set(overrides) - set(CONFIG_FIELDS)
+		if unknown:
+			raise TypeError('Unknown simulation constants: {0}'.format(', '.join(sorted(unknown))))
+		for name in CONFIG_FIELDS:
+			object.__setattr__(self, name, overrides.get(name, getattr(G, name)))
+		
+		object.__setattr__(self, 'SIMULATION_HOURS', self.SIMULATION_TIME / 3600)
+		object.__setattr__(self, 'LABOR_RATE', self.MACHINE_RATE + self.OVERHEAD_RATE 
+						+ (self.MAIN_OPERATORS + self.SUPPORT_OPERATORS) * self.OPERATOR_RATE)
+		object.__setattr__(self, 'RUN_LABOR_COST', self.SIMULATION_HOURS * self.LABOR_RATE)
+		object.__setattr__(self, 'UNIT_MATERIAL_COST', self.SHEET_COST + self.BOX_COST)
+	
+	def __setattr__(self, name, value):
+		raise AttributeError('SimConfig is immutable, use replace() to change {0}'.format(name))
+	
+	def __delattr__(self, name):
+		raise AttributeError('SimConfig is immutable')
+	
+	def __reduce__(self):
+		return (_make_config, (self.as_dict(),))
+	
+	def __eq__(self, other):
+		if not isinstance(other, SimConfig):
+			return NotImplemented
+		return self.as_dict() == other.as_dict()
+	
+	def __hash__(self):
+		return hash(tuple(getattr(self, name) for name in CONFIG_FIELDS))
+	
+	def __repr__(self):
+		changed = ['{0}={1!r}'.format(name, getattr(self, name)) for name in CONFIG_FIELDS
+				   if getattr(self, name) != getattr(G, name)]
+		return 'SimConfig({0})'.format(', '.join(changed))
+	
+	def as_dict(self):
+		return {name: getattr(self, name) for name in CONFIG_FIELDS}
+	
+	def replace(self, **changes):
+		#Returns a new configuration with `changes` applied; derived values are recomputed
+		values = self.as_dict()
+		values.update(changes)
+		return SimConfig(**values)
+	
+	def run_cost(self, pcs):
+		#Material and labor cost of producing `pcs` parts over one simulation run
+		return pcs * self.UNIT_MATERIAL_COST + self.RUN_LABOR_COST
+	
+	def annual_cost(self, pcs):
+		#Run cost scaled up to the annual volume `EAU`
+		return self.EAU / max(1, pcs) * self.run_cost(pcs)
+	
+	def mean_annual_cost(self, material_weight, labor_weight):
+		#Mean of `annual_cost()` over replications, from the means of pcs / max(1, pcs) and 1 / max(1, pcs)
+		return self.EAU * (material_weight * self.UNIT_MATERIAL_COST + labor_weight * self.RUN_LABOR_COST)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product, repeat
+from numpy.random import SeedSequence
+from .constants import SimConfig
+from .tesla import run_point
+
+
+
+class Design_Point(object):
+	#Result of running one staffing/equipment configuration, scored on annual cost and throughput
+
+	def __init__(self, config, setting):
+		self.config = config
+		self.setting = setting
+		self.cost = setting.cost
+		self.pcs = setting.pcs
+		self.failures = setting.failures
+		self.wip = setting.wip
+		self.throughput = setting.pcs / config.SIMULATION_HOURS		#parts/hr
+
+	def label(self):
+		return '{0} oprs {1} robots {2} sheeters {3:.1f}s cycle'.format(self.config.MAIN_OPERATORS + self.config.SUPPORT_OPERATORS,
+			self.config.ROUTERS, self.config.SHEETERS, self.config.THERMOFORMER_RUNTIME)
+
+	def dominates(self, other, margin=0):
+		#True when this point beats `other` on both cost and throughput by at least `margin`;
+		#	with no margin it only has to be strictly better on one of them
+		if self.cost * (1 + margin) > other.cost or self.throughput < other.throughput * (1 + margin):
+			return False
+		return margin > 0 or self.cost < other.cost or self.throughput > other.throughput
+
+
+def design_grid(main_operators=(1, 2), support_operators=(0, 1, 2, 3), routers=(1, 2, 3, 4), sheeters=(1, 2),
+				cycles=(60, 75, 90, 105, 120), config=None):
+	#Every combination of the given operator counts, router count, sheeter count and thermoformer cycle time
+	if config is None:
+		config = SimConfig()
+	return [config.replace(MAIN_OPERATORS=m, SUPPORT_OPERATORS=s, ROUTERS=r, SHEETERS=sh, THERMOFORMER_RUNTIME=c)
+			for m, s, r, sh, c in product(main_operators, support_operators, routers, sheeters, cycles)]
+
+
+def evaluate_design(config, point_seed, replications=1, precision=0.01):
+	#Kept at module level so process pool workers can unpickle it
+	return Design_Point(config, run_point(config, point_seed, replications, precision))
+
+
+def evaluate_designs(configs, seeds, workers=1, replications=1, precision=0.01):
+	if workers > 1:
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			return list(executor.map(evaluate_design, configs, seeds, repeat(replications), repeat(precision),
+									 chunksize=max(1, len(configs) // (workers * 4))))
+	return list(map(evaluate_design, configs, seeds, repeat(replications), repeat(precision)))
+
+
+def pareto_front(points, margin=0):
+	#Points not dominated by any other, sorted by throughput
+	front = [p for p in points if not any(q.dominates(p, margin) for q in points if q is not p)]
+	return sorted(front, key=lambda p: p.throughput)
+
+
+def explore(configs, seed=None, workers=1, screen_fraction=0.2, margin=0.05, replications=1, precision=0.01):
+	#Maps out the cost/throughput trade-off over `configs` (see `design_grid()`). Every configuration is first
+	#	screened with a run of `screen_fraction` of the simulation time; anything beaten by another configuration
+	#	by more than `margin` on both cost and throughput is dropped, and only the survivors get full-length runs.
+	#	Returns the Pareto front of the full runs and the list of every fully simulated point.
+	if seed is None:
+		seed = configs[0].SEED
+	seeds = [int(s) for s in SeedSequence(seed).generate_state(len(configs))]
+
+	screen_configs = [c.replace(SIMULATION_TIME=c.SIMULATION_TIME * screen_fraction) for c in configs]
+	screened = evaluate_designs(screen_configs, seeds, workers)
+	survivors = [i for i, p in enumerate(screened) if not any(q.dominates(p, margin) for q in screened if q is not p)]
+	print('Screened {0} configurations, {1} kept for full runs'.format(len(configs), len(survivors)))
+
+	points = evaluate_designs([configs[i] for i in survivors], [seeds[i] for i in survivors], workers, replications, precision)
+	front = pareto_front(points)
+	for point in front:
+		print('{0}: {1:.1f} parts/hr at ${2:.0f}/yr'.format(point.label(), point.throughput, point.cost))
+	return front, points
@@ -1,84 +1,352 @@
 #!/usr/bin/env python3
 
+import zlib
+import numpy as np
 import simpy
-from numpy.random import normal, seed
-from .constants import G
+from .metrics import State_Timer, Level_Accumulator, Wait_Accumulator, BUSY, BLOCKED, STARVED, WAITING, IDLE, DOWN
+from .event_trace import (COMPLETED, LOADED, UNLOADED, CYCLE, FORMED, MOLD_LOADED, OVEN_LOADED, LOAD_FAILED, PREEMPTED, BOX_BUILT,
+						  PACKED, BOX_CLOSED, BROKE_DOWN, REPAIRED)
 
 
 
+class Duration_Stream(object):
+	#Normally distributed durations for one machine step, drawn from `rng` in clamped batches and handed out one at a time
+	
+	def __init__(self, rng, loc, scale, minimum=0, batch_size=1024):
+		self.rng = rng
+		self.loc = loc
+		self.scale = scale
+		self.minimum = minimum
+		self.batch_size = batch_size
+		self.values = []
+	
+	def refill(self):
+		batch = np.maximum(self.rng.normal(loc=self.loc, scale=self.scale, size=self.batch_size), self.minimum).tolist()
+		batch.reverse()
+		self.values = batch
+	
+	def draw(self):
+		if not self.values:
+			self.refill()
+		return self.values.pop()
+
+
+class Exponential_Stream(Duration_Stream):
+	#Exponentially distributed durations with mean `mean`, e.g. times between failures, drawn in batches
+	
+	def __init__(self, rng, mean, batch_size=64):
+		super(Exponential_Stream, self).__init__(rng, mean, 0, batch_size=batch_size)
+	
+	def refill(self):
+		batch = self.rng.exponential(self.loc, size=self.batch_size).tolist()
+		batch.reverse()
+		self.values = batch
+
+
+class Breakdowns(object):
+	#MTBF/MTTR downtime for one machine, `station`: a failure takes its `machine` resource at top priority,
+	#	preempting the step in progress, for an exponential repair. Draws come from a generator spawned off the
+	#	station's, so breakdowns don't change its own durations. An `mtbf` of 0 turns them off.
+	
+	def __init__(self, station):
+		self.station = station
+		self.env = station.env
+		self.rng = None
+		self.machine = simpy.PreemptiveResource(self.env, capacity=1)
+		self.mtbf = 0
+		self.mttr = 0
+		self.count = 0
+		self.downtime = 0.0
+		self.down_since = None
+		self.down_until = None
+		self.process = None
+	
+	def configure(self, mtbf, mttr):
+		self.mtbf = mtbf
+		self.mttr = mttr
+		if mtbf > 0:
+			if self.rng is None:
+				self.rng = self.station.rng.spawn(1)[0]
+			self.time_to_failure = Exponential_Stream(self.rng, mtbf)
+			self.repair_time = Exponential_Stream(self.rng, mttr)
+			if self.process is None:
+				self.process = self.env.process(self.run())
+	
+	def run(self):
+		env = self.env
+		station = self.station
+		while True:
+			#`down_until` is already set when a restored snapshot was part way through a repair
+			if self.down_until is None:
+				yield env.timeout(self.time_to_failure.draw())
+				if self.mtbf <= 0:
+					self.process = None
+					return
+				self.count += 1
+				self.down_since = env.now
+				self.down_until = env.now + self.repair_time.draw()
+				if station.user_input == True:
+					print("{0} broke down at {1}".format(station.name, env.now))
+				if station.trace is not None:
+					station.trace.record(env.now, station.trace_id, BROKE_DOWN)
+			with self.machine.request(priority=0) as req:
+				yield req
+				yield env.timeout(self.down_until - env.now)
+				self.downtime += env.now - self.down_since
+				self.down_since = self.down_until = None
+				if station.user_input == True:
+					print("{0} was repaired at {1}".format(station.name, env.now))
+				if station.trace is not None:
+					station.trace.record(env.now, station.trace_id, REPAIRED)
+	
+	def work(self, duration, timer):
+		#`yield from` in place of a timeout of `duration` machine seconds. A breakdown part way through stops
+		#	the clock and the rest is run once the machine is repaired; time spent waiting on a repair is DOWN.
+		if self.process is None:
+			yield self.env.timeout(duration)
+			return
+		while True:
+			with self.machine.request(priority=1) as req:
+				if not req.triggered:
+					timer.set(DOWN)
+				yield req
+				timer.set(BUSY)
+				start = self.env.now
+				try:
+					yield self.env.timeout(duration)
+					return
+				except simpy.Interrupt:
+					duration -= self.env.now - start
+	
+	def down_time(self):
+		#Repair time so far, including a repair in progress
+		if self.down_since is None:
+			return self.downtime
+		return self.downtime + self.env.now - self.down_since
+	
+	def reset(self):
+		self.count = 0
+		self.downtime = 0.0
+		if self.down_since is not None:
+			self.down_since = self.env.now
+
+
+class Common_Streams(object):
+	#Common random numbers: a separate generator for every piece of equipment, seeded from `seed` and the
+	#	equipment's name. Each machine then sees the same durations in every setting run with the same seed,
+	#	however much the rest of the cell changes, so differences between settings aren't swamped by noise.
+	#	Stations spawn a child generator per `Duration_Stream`, so one stream's refills never shift another's.
+	
+	def __init__(self, seed):
+		self.seed = seed
+		self.generators = {}
+	
+	def station(self, name):
+		if name not in self.generators:
+			sequence = np.random.SeedSequence(self.seed, spawn_key=(zlib.crc32(name.encode()),))
+			self.generators[name] = np.random.default_rng(sequence)
+		return self.generators[name]
+
+
+class Timed_Request(simpy.resources.resource.Request):
+	#Request that remembers when it was made so the wait for an `Operator` can be measured
+	
+	def __init__(self, resource):
+		self.created = resource._env.now
+		super(Timed_Request, self).__init__(resource)
+
+
+class Timed_Put(simpy.resources.container.ContainerPut):
+	
+	def __init__(self, container, amount):
+		self.created = container._env.now
+		super(Timed_Put, self).__init__(container, amount)
+
+
+class Timed_Get(simpy.resources.container.ContainerGet):
+	
+	def __init__(self, container, amount):
+		self.created = container._env.now
+		super(Timed_Get, self).__init__(container, amount)
+
+
 class Operator(simpy.Resource):
 	#Operators are treated as a basic Resource that may be separated by tasks
+	#	Tracks the time-weighted queue length and number of busy operators, and the wait of every request
+	
+	request = simpy.core.BoundClass(Timed_Request)
 	
 	def __init__(self, env, capacity):
 		super(Operator, self).__init__(env, capacity=capacity)
 		self.env = env
+		self.queue_length = Level_Accumulator(env)
+		self.in_use = Level_Accumulator(env)
+		self.waits = Wait_Accumulator()
+	
+	def _do_put(self, event):
+		proceed = super(Operator, self)._do_put(event)
+		if event.triggered:
+			self.waits.add(self.env.now - event.created)
+			self.in_use.update(len(self.users))
+		return proceed
+	
+	def _do_get(self, event):
+		proceed = super(Operator, self)._do_get(event)
+		self.in_use.update(len(self.users))
+		return proceed
+	
+	def _trigger_put(self, get_event):
+		super(Operator, self)._trigger_put(get_event)
+		self.queue_length.update(len(self.put_queue))
+	
+	def reset_metrics(self):
+		self.queue_length.reset()
+		self.in_use.reset()
+		self.waits.reset()
 
 
-class Sheeter(object):
-	#Automated sheeting operation to convert roll stock into sheets to be inserted into the `Load_Station`
+class Buffer(simpy.Container):
+	#Container between stations that tracks its time-weighted level and how long puts (blocked upstream)
+	#	and gets (starved downstream) wait
 	
-	def __init__(self, name, env, operator, finished_stock, user_input=False):
-		self.finished_stock = finished_stock
+	put = simpy.core.BoundClass(Timed_Put)
+	get = simpy.core.BoundClass(Timed_Get)
+	
+	def __init__(self, env, capacity, init=0):
+		super(Buffer, self).__init__(env, capacity, init=init)
+		self.levels = Level_Accumulator(env, init)
+		self.put_waits = Wait_Accumulator()
+		self.get_waits = Wait_Accumulator()
+	
+	def _do_put(self, event):
+		proceed = super(Buffer, self)._do_put(event)
+		if proceed:
+			self.levels.update(self._level)
+			self.put_waits.add(self._env.now - event.created)
+		return proceed
+	
+	def _do_get(self, event):
+		proceed = super(Buffer, self)._do_get(event)
+		if proceed:
+			self.levels.update(self._level)
+			self.get_waits.add(self._env.now - event.created)
+		return proceed
+	
+	def reset_metrics(self):
+		self.levels.reset()
+		self.put_waits.reset()
+		self.get_waits.reset()
+
+
+class Equipment(object):
+	#Wiring shared by every station: its name, trace id, `State_Timer` and a child generator per duration stream.
+	#	`configure()` (re)reads the run parameters, e.g. when a warmed-up cell is forked into a new setting.
+	
+	#Number of `Duration_Stream`s the station draws from
+	STREAMS = 0
+	
+	def __init__(self, name, env, rng, user_input=False, trace=None):
 		self.name = name
 		self.env = env
-		self.operator = operator
+		self.rng = rng
+		self.generators = rng.spawn(self.STREAMS)
 		self.user_input = user_input
+		self.trace = trace
+		self.trace_id = trace.station_id(name) if trace is not None else -1
+		self.timer = State_Timer(env)
+
+
+class Sheeter(Equipment):
+	#Automated sheeting operation to convert roll stock into sheets to be inserted into the `Load_Station`
+	
+	STREAMS = 1
+	
+	def __init__(self, name, env, config, rng, operator, finished_stock, user_input=False, trace=None):
+		super(Sheeter, self).__init__(name, env, rng, user_input, trace)
+		self.finished_stock = finished_stock
+		self.breakdowns = Breakdowns(self)
+		self.configure(config)
+		self.operator = operator
 		self.sheets = 0
 		self.status = 'READY'
 		self.process = env.process(self.run(self.operator, self.env))
 		
+	def configure(self, config):
+		self.config = config
+		self.runtime = Duration_Stream(self.generators[0], config.SHEETER_RUNTIME, config.SHEETER_RUNTIME_STDEV, minimum=0)
+		self.breakdowns.configure(config.SHEETER_MTBF, config.SHEETER_MTTR)
+	
 	def run(self, operator, env):
 		while True:		
 			if self.status == 'COMPLETE':
-				yield self.finished_stock.put(G.SHEETER_YIELD)
+				self.timer.set(BLOCKED)
+				yield self.finished_stock.put(self.config.SHEETER_YIELD)
 				self.unload_part(self.operator, self.env)
 			
 			if self.status == 'READY':
-				yield env.timeout(max(0, normal(loc=G.SHEETER_RUNTIME, scale=G.SHEETER_RUNTIME_STDEV)))
+				self.timer.set(BUSY)
+				yield from self.breakdowns.work(self.runtime.draw(), self.timer)
 				self.sheets += 1
 				if self.user_input == True:
 					print("{0} completed a sheet at {1}".format(self.name, env.now))
+				if self.trace is not None:
+					self.trace.record(env.now, self.trace_id, COMPLETED)
 				self.status = 'COMPLETE'
 
 	def unload_part(self, operator, env):
 		if self.user_input == True:
 			print("{0} unloaded a sheet at {1}".format(self.name, env.now))
+		if self.trace is not None:
+			self.trace.record(env.now, self.trace_id, UNLOADED)
 		self.status = 'READY'
 
 
-class Thermoformer(object):
+class Thermoformer(Equipment):
 	#3-Station thermoformer
 	#NOTE: delayed unloading of formed sheets won't stop the thermoformer
 	#		any excess sheets will be treated as 'offline' WIP to be processed
 	#		outside of the cell at a later time.
 	
-	def __init__(self, name, env, station, load_station, user_input=False):
+	STREAMS = 1
+	
+	def __init__(self, name, env, config, rng, station, load_station, user_input=False, trace=None):
+		super(Thermoformer, self).__init__(name, env, rng, user_input, trace)
 		self.station = station
 		self.load_station = load_station
 		self.loaded_stock = load_station.finished_stock
 		self.oven_stock = simpy.Container(env, 1)
 		self.mold_stock = simpy.Container(env, 1)
-		self.user_input = user_input
-		self.name = name
-		self.env = env
+		self.breakdowns = Breakdowns(self)
+		self.configure(config)
 		self.cycles = 0
 		self.failures = 0
 		self.process = env.process(self.run(self.env))
 		
+	def configure(self, config):
+		self.config = config
+		self.runtime = Duration_Stream(self.generators[0], config.THERMOFORMER_RUNTIME, config.THERMOFORMER_RUNTIME_STDEV, minimum=0)
+		self.breakdowns.configure(config.THERMOFORMER_MTBF, config.THERMOFORMER_MTTR)
+	
 	def run(self, env):
 		while True:		
-			yield env.timeout(max(0, normal(loc=G.THERMOFORMER_RUNTIME, scale=G.THERMOFORMER_RUNTIME_STDEV)))
+			self.timer.set(BUSY)
+			yield from self.breakdowns.work(self.runtime.draw(), self.timer)
 			with self.station.request(priority=0) as st:
+				self.timer.set(WAITING)
 				yield st
 				self.cycles += 1
 				if self.user_input == True:
 					print("Ran a cycle at {0}".format(env.now))
+				if self.trace is not None:
+					self.trace.record(env.now, self.trace_id, CYCLE)
 				if self.mold_stock.level > 0:
 					yield self.mold_stock.get(1)
 					self.load_station.status = 'COMPLETE'
 					if self.user_input == True:
 						print("{0} created a formed sheet at {1}".format(self.name, env.now))
-					yield self.load_station.finished_stock.put(G.THERMOFORMER_YIELD)
+					if self.trace is not None:
+						self.trace.record(env.now, self.trace_id, FORMED, self.config.THERMOFORMER_YIELD)
+					yield self.load_station.finished_stock.put(self.config.THERMOFORMER_YIELD)
 				else:
 					self.load_station.status = 'EMPTY'
 				
@@ -87,250 +355,377 @@ class Thermoformer(object):
 					yield self.mold_stock.put(1)
 					if self.user_input == True:
 						print('Sheet has been put in the mold at {0}'.format(env.now))
+					if self.trace is not None:
+						self.trace.record(env.now, self.trace_id, MOLD_LOADED)
 				
-				if self.load_station.capacity.level == G.LOAD_STATION_CAPACITY:
+				if self.load_station.capacity.level == self.config.LOAD_STATION_CAPACITY:
 					if self.user_input == True:
 						print('Putting a sheet in the oven at {0}'.format(env.now))
 					yield self.oven_stock.put(1)
 					if self.user_input == True:
 						print('Sheet has been put in the oven at {0}'.format(env.now))
+					if self.trace is not None:
+						self.trace.record(env.now, self.trace_id, OVEN_LOADED)
 				else:
 					if self.user_input == True:
 						print('FAILED TO LOAD THERMOFORMER IN TIME')
+					if self.trace is not None:
+						self.trace.record(env.now, self.trace_id, LOAD_FAILED)
 					self.failures += 1
 				
 				#Consume all loaded raw sheet stock (scrapped)
 				if self.load_station.capacity.level > 0:
 					yield self.load_station.capacity.get(self.load_station.capacity.level) 
 				
-				env.process(self.load_station.run(self.load_station.operator, self.env))
+				self.load_station.next_cycle()
 
 
-class Load_Station(object):
+class Load_Station(Equipment):
 	#Interactive station used to load and unload sheets from the `Thermoformer`
 	
-	def __init__(self, name, env, operator, station, raw_stock, finished_stock, user_input=False):
+	STREAMS = 2
+	
+	def __init__(self, name, env, config, rng, operator, station, raw_stock, finished_stock, user_input=False, trace=None):
+		super(Load_Station, self).__init__(name, env, rng, user_input, trace)
 		self.station = station
 		self.raw_stock = raw_stock
 		self.finished_stock = finished_stock
-		self.name = name
-		self.capacity = simpy.Container(env, G.LOAD_STATION_CAPACITY)
-		self.env = env
+		self.capacity = simpy.Container(env, config.LOAD_STATION_CAPACITY)
+		self.configure(config)
 		self.operator = operator
-		self.user_input = user_input
 		self.parts = 0
 		self.status = 'EMPTY'
+		self.wake = None
 		self.process = env.process(self.run(self.operator, self.env))
 		
-	def run(self, operator, env):
-		while self.status != 'READY':
-			if self.status == 'EMPTY':
-				yield self.raw_stock.get(1)
-				load_proc = env.process(self.load_sheet(self.operator, self.env))
-				yield load_proc
-			
-			if self.status == 'COMPLETE':
-				unload_proc = env.process(self.unload_sheet(self.operator, self.env))
-				yield unload_proc
+	def configure(self, config):
+		self.config = config
+		self.unload_time = Duration_Stream(self.generators[0], config.LOAD_STATION_UNLOAD_TIME, config.LOAD_STATION_UNLOAD_TIME_STDEV, minimum=5)
+		self.load_time = Duration_Stream(self.generators[1], config.LOAD_STATION_LOAD_TIME, config.LOAD_STATION_LOAD_TIME_STDEV, minimum=7.5)
+	
+	def run(self, operator, env, resident=True):
+		#Loads and unloads until the next sheet is ready for the thermoformer. The resident loop then sleeps until
+		#	`next_cycle()` wakes it; loops started while it was still busy end instead.
+		while True:
+			while self.status != 'READY':
+				if self.status == 'EMPTY':
+					self.timer.set(STARVED)
+					yield self.raw_stock.get(1)
+					load_proc = env.process(self.load_sheet(self.operator, self.env))
+					yield load_proc
+				
+				if self.status == 'COMPLETE':
+					unload_proc = env.process(self.unload_sheet(self.operator, self.env))
+					yield unload_proc
+			self.timer.set(IDLE)
+			if not resident:
+				return
+			self.wake = env.event()
+			yield self.wake
+	
+	def next_cycle(self):
+		#Called by the thermoformer at the end of every cycle. Wakes the resident loop if it is waiting, otherwise
+		#	starts one more loop alongside it, as the thermoformer did every cycle before the loop was resident.
+		#	The wake-up is scheduled at URGENT priority, like the start of a new process, so events keep their order.
+		if self.wake is not None:
+			wake, self.wake = self.wake, None
+			wake._ok = True
+			wake._value = None
+			self.env.schedule(wake, simpy.events.URGENT)
+		else:
+			self.env.process(self.run(self.operator, self.env, resident=False))
 			
 	def unload_sheet(self, operator, env):
 		with self.station.request(priority=100) as st:
+			self.timer.set(WAITING)
 			yield st
 			try:
 				with operator.request() as opr:
+					self.timer.set(WAITING)
 					yield opr
-					yield env.timeout(max(5, normal(loc=G.LOAD_STATION_UNLOAD_TIME, scale=G.LOAD_STATION_UNLOAD_TIME_STDEV)))
+					self.timer.set(BUSY)
+					yield env.timeout(self.unload_time.draw())
 					if self.user_input == True:
 						print("{0} unloaded a formed sheet at {1}".format(self.name, env.now))
+					if self.trace is not None:
+						self.trace.record(env.now, self.trace_id, UNLOADED)
 					self.status = 'EMPTY'
 			except simpy.Interrupt as interrupt:
 				by = interrupt.cause.by
 				usage = env.now - interrupt.cause.usage_since
 				if self.user_input == True:
 					print('unload_sheet on {0} got preempted by {1} after {2}'.format(self.name, by, usage))
+				if self.trace is not None:
+					self.trace.record(env.now, self.trace_id, PREEMPTED)
 
 	def load_sheet(self, operator, env):
 		with self.station.request(priority=100) as st:
+			self.timer.set(WAITING)
 			yield st
 			try:
 				with operator.request() as opr:
+					self.timer.set(WAITING)
 					yield opr
-					yield env.timeout(max(7.5, normal(loc=G.LOAD_STATION_LOAD_TIME, scale=G.LOAD_STATION_LOAD_TIME_STDEV)))
+					self.timer.set(BUSY)
+					yield env.timeout(self.load_time.draw())
 					yield self.capacity.put(1)
 					if self.user_input == True:
 						print("{0} loaded a sheet at {1}".format(self.name, env.now))
-					if self.capacity.level == G.LOAD_STATION_CAPACITY:
+					if self.trace is not None:
+						self.trace.record(env.now, self.trace_id, LOADED)
+					if self.capacity.level == self.config.LOAD_STATION_CAPACITY:
 						self.status = 'READY'
 			except simpy.Interrupt as interrupt:
 				by = interrupt.cause.by
 				usage = env.now - interrupt.cause.usage_since
 				if self.user_input == True:
 					print('load_sheet on {0} got preempted by {1} after {2}'.format(self.name, by, usage))
+				if self.trace is not None:
+					self.trace.record(env.now, self.trace_id, PREEMPTED)
 
 
-class Splitter(object):
+class Splitter(Equipment):
 	#Manual hand cutting operation used to split a formed sheet into two parts for downstream trimming
 	
-	def __init__(self, name, env, operator, raw_stock, finished_stock, user_input=False):
+	STREAMS = 1
+	
+	def __init__(self, name, env, config, rng, operator, raw_stock, finished_stock, user_input=False, trace=None):
+		super(Splitter, self).__init__(name, env, rng, user_input, trace)
 		self.raw_stock = raw_stock
 		self.finished_stock = finished_stock
-		self.name = name
-		self.env = env
+		self.configure(config)
 		self.operator = operator
-		self.user_input = user_input
 		self.parts = 0
 		self.process = env.process(self.run(self.operator, self.env))
 		
+	def configure(self, config):
+		self.config = config
+		self.runtime = Duration_Stream(self.generators[0], config.SPLITTER_RUNTIME, config.SPLITTER_RUNTIME_STDEV, minimum=5)
+	
 	def run(self, operator, env):
 		while True:
-			yield self.raw_stock.get(G.SPLITTER_CAPACITY)
+			self.timer.set(STARVED)
+			yield self.raw_stock.get(self.config.SPLITTER_CAPACITY)
 			with operator.request() as opr:
+				self.timer.set(WAITING)
 				yield opr
-				yield env.timeout(max(5, normal(loc=G.SPLITTER_RUNTIME, scale=G.SPLITTER_RUNTIME_STDEV)))
-				self.parts += G.SPLITTER_YIELD
-			yield self.finished_stock.put(G.SPLITTER_YIELD)
+				self.timer.set(BUSY)
+				yield env.timeout(self.runtime.draw())
+				self.parts += self.config.SPLITTER_YIELD
+			self.timer.set(BLOCKED)
+			yield self.finished_stock.put(self.config.SPLITTER_YIELD)
 			if self.user_input == True:
 				print("{0} split a sheet at {1}".format(self.name, env.now))
+			if self.trace is not None:
+				self.trace.record(env.now, self.trace_id, COMPLETED, self.config.SPLITTER_YIELD)
 				
 
-class Router(object):
+class Router(Equipment):
 	#Robotic trim operation used to cut the majority of the offal from the `Thermoformer`
 	
-	def __init__(self, name, env, operator, raw_stock, finished_stock, user_input=False):
+	STREAMS = 3
+	
+	def __init__(self, name, env, config, rng, operator, raw_stock, finished_stock, user_input=False, trace=None):
+		super(Router, self).__init__(name, env, rng, user_input, trace)
 		self.raw_stock = raw_stock
 		self.finished_stock = finished_stock
-		self.name = name
-		self.env = env
+		self.breakdowns = Breakdowns(self)
+		self.configure(config)
 		self.operator = operator
-		self.user_input = user_input
 		self.parts = 0
 		self.status = 'EMPTY'
 		self.process = env.process(self.run(self.operator, self.env))
 		
+	def configure(self, config):
+		self.config = config
+		self.runtime = Duration_Stream(self.generators[0], config.ROUTER_RUNTIME, config.ROUTER_RUNTIME_STDEV, minimum=0)
+		self.unload_time = Duration_Stream(self.generators[1], config.ROUTER_UNLOAD_TIME, config.ROUTER_UNLOAD_TIME_STDEV, minimum=10)
+		self.load_time = Duration_Stream(self.generators[2], config.ROUTER_LOAD_TIME, config.ROUTER_LOAD_TIME_STDEV, minimum=7)
+		self.breakdowns.configure(config.ROUTER_MTBF, config.ROUTER_MTTR)
+	
 	def run(self, operator, env):
 		while True:
 			if self.status == 'EMPTY':
-				yield self.raw_stock.get(G.ROUTER_CAPACITY)
+				self.timer.set(STARVED)
+				yield self.raw_stock.get(self.config.ROUTER_CAPACITY)
 				yield env.process(self.load_part(self.operator, self.env))
 			
 			if self.status == 'COMPLETE':
-				yield self.finished_stock.put(G.ROUTER_YIELD)
+				self.timer.set(BLOCKED)
+				yield self.finished_stock.put(self.config.ROUTER_YIELD)
 				yield env.process(self.unload_part(self.operator, self.env))
 			
 			if self.status == 'READY':
-				yield env.timeout(max(0, normal(loc=G.ROUTER_RUNTIME, scale=G.ROUTER_RUNTIME_STDEV)))
-				self.parts += G.ROUTER_YIELD
+				self.timer.set(BUSY)
+				yield from self.breakdowns.work(self.runtime.draw(), self.timer)
+				self.parts += self.config.ROUTER_YIELD
 				if self.user_input == True:
 					print("{0} completed a part at {1}".format(self.name, env.now))
+				if self.trace is not None:
+					self.trace.record(env.now, self.trace_id, COMPLETED, self.config.ROUTER_YIELD)
 				self.status = 'COMPLETE'
 
 	def unload_part(self, operator, env):
 		with operator.request() as opr:
+			self.timer.set(WAITING)
 			yield opr
-			yield env.timeout(max(10, normal(loc=G.ROUTER_UNLOAD_TIME, scale=G.ROUTER_UNLOAD_TIME_STDEV)))
+			self.timer.set(BUSY)
+			yield env.timeout(self.unload_time.draw())
 			if self.user_input == True:
 				print("{0} unloaded a part at {1}".format(self.name, env.now))
+			if self.trace is not None:
+				self.trace.record(env.now, self.trace_id, UNLOADED)
 			self.status = 'EMPTY'
 	
 	def load_part(self, operator, env):
 		with operator.request() as opr:
+			self.timer.set(WAITING)
 			yield opr
-			yield env.timeout(max(7, normal(loc=G.ROUTER_LOAD_TIME, scale=G.ROUTER_LOAD_TIME_STDEV)))
+			self.timer.set(BUSY)
+			yield env.timeout(self.load_time.draw())
 			if self.user_input == True:
 				print("{0} loaded a part at {1}".format(self.name, env.now))
+			if self.trace is not None:
+				self.trace.record(env.now, self.trace_id, LOADED)
 			self.status = 'READY'
 
 
-class Hotwire_Trimmer(object):
+class Hotwire_Trimmer(Equipment):
 	#Trimming operation that uses hotwires on pistons to trim the ends after the `Router`
 	
-	def __init__(self, name, env, operator, raw_stock, finished_stock, user_input=False):
+	STREAMS = 1
+	
+	def __init__(self, name, env, config, rng, operator, raw_stock, finished_stock, user_input=False, trace=None):
+		super(Hotwire_Trimmer, self).__init__(name, env, rng, user_input, trace)
 		self.raw_stock = raw_stock
 		self.finished_stock = finished_stock
-		self.name = name
-		self.env = env
+		self.breakdowns = Breakdowns(self)
+		self.configure(config)
 		self.operator = operator
-		self.user_input = user_input
 		self.parts = 0
 		self.process = env.process(self.run(self.operator, self.env))
 		
+	def configure(self, config):
+		self.config = config
+		self.runtime = Duration_Stream(self.generators[0], config.TRIMMER_RUNTIME, config.TRIMMER_RUNTIME_STDEV, minimum=10)
+		self.breakdowns.configure(config.TRIMMER_MTBF, config.TRIMMER_MTTR)
+	
 	def run(self, operator, env):
 		while True:
-			yield self.raw_stock.get(G.TRIMMER_CAPACITY)
+			self.timer.set(STARVED)
+			yield self.raw_stock.get(self.config.TRIMMER_CAPACITY)
 			with operator.request() as opr:
+				self.timer.set(WAITING)
 				yield opr
-				yield env.timeout(max(10, normal(loc=G.TRIMMER_RUNTIME, scale=G.TRIMMER_RUNTIME_STDEV)))
-				self.parts += G.TRIMMER_YIELD
-			yield self.finished_stock.put(G.TRIMMER_YIELD)
+				self.timer.set(BUSY)
+				yield from self.breakdowns.work(self.runtime.draw(), self.timer)
+				self.parts += self.config.TRIMMER_YIELD
+			self.timer.set(BLOCKED)
+			yield self.finished_stock.put(self.config.TRIMMER_YIELD)
 			if self.user_input == True:
 				print("{0} trimmed a part at {1}".format(self.name, env.now))
+			if self.trace is not None:
+				self.trace.record(env.now, self.trace_id, COMPLETED, self.config.TRIMMER_YIELD)
 
 
-class Driller(object):
+class Driller(Equipment):
 	#Drilling fixture used to create seven small openings in the part after the `Hotwire_Trimmer`
 	
-	def __init__(self, name, env, operator, raw_stock, finished_stock, user_input=False):
+	STREAMS = 1
+	
+	def __init__(self, name, env, config, rng, operator, raw_stock, finished_stock, user_input=False, trace=None):
+		super(Driller, self).__init__(name, env, rng, user_input, trace)
 		self.raw_stock = raw_stock
 		self.finished_stock = finished_stock
-		self.name = name
-		self.env = env
+		self.breakdowns = Breakdowns(self)
+		self.configure(config)
 		self.operator = operator
-		self.user_input = user_input
 		self.parts = 0
 		self.process = env.process(self.run(self.operator, self.env))
 		
+	def configure(self, config):
+		self.config = config
+		self.runtime = Duration_Stream(self.generators[0], config.DRILLER_RUNTIME, config.DRILLER_RUNTIME_STDEV, minimum=5)
+		self.breakdowns.configure(config.DRILLER_MTBF, config.DRILLER_MTTR)
+	
 	def run(self, operator, env):
 		while True:
-			yield self.raw_stock.get(G.DRILLER_CAPACITY)
+			self.timer.set(STARVED)
+			yield self.raw_stock.get(self.config.DRILLER_CAPACITY)
 			with operator.request() as opr:
+				self.timer.set(WAITING)
 				yield opr
-				yield env.timeout(max(5, normal(loc=G.DRILLER_RUNTIME, scale=G.DRILLER_RUNTIME_STDEV)))
-				self.parts += G.DRILLER_YIELD
-			yield self.finished_stock.put(G.DRILLER_YIELD)
+				self.timer.set(BUSY)
+				yield from self.breakdowns.work(self.runtime.draw(), self.timer)
+				self.parts += self.config.DRILLER_YIELD
+			self.timer.set(BLOCKED)
+			yield self.finished_stock.put(self.config.DRILLER_YIELD)
 			if self.user_input == True:
 				print("{0} drilled a part at {1}".format(self.name, env.now))
+			if self.trace is not None:
+				self.trace.record(env.now, self.trace_id, COMPLETED, self.config.DRILLER_YIELD)
 
 
-class Boxer(object):
+class Boxer(Equipment):
 	#Operation for packing the finished parts 
 	
-	def __init__(self, name, env, operator, raw_stock, finished_stock, user_input=False):
+	STREAMS = 3
+	
+	def __init__(self, name, env, config, rng, operator, raw_stock, finished_stock, user_input=False, trace=None):
+		super(Boxer, self).__init__(name, env, rng, user_input, trace)
 		self.raw_stock = raw_stock
 		self.finished_stock = finished_stock
-		self.name = name
-		self.env = env
+		self.configure(config)
 		self.operator = operator
-		self.user_input = user_input
 		self.boxes = 0
 		self.status = 'NO BOX'
 		self.process = env.process(self.run())
 	
+	def configure(self, config):
+		self.config = config
+		self.pack_time = Duration_Stream(self.generators[0], config.BOX_PACKTIME, config.BOX_PACKTIME_STDEV, minimum=4)
+		self.build_time = Duration_Stream(self.generators[1], config.BOX_BUILDTIME, config.BOX_BUILDTIME_STDEV, minimum=10)
+		self.close_time = Duration_Stream(self.generators[2], config.BOX_CLOSETIME, config.BOX_CLOSETIME_STDEV, minimum=20)
+	
 	def run(self):
 		while True:
 			if self.status == 'NO BOX':
 				yield self.env.process(self.build_box())
 			
 			if self.status == 'READY':
+				self.timer.set(STARVED)
 				yield self.raw_stock.get(1)
 				with self.operator.request() as opr:
-					yield self.env.timeout(max(4, normal(loc=G.BOX_PACKTIME, scale=G.BOX_PACKTIME_STDEV)))
+					self.timer.set(BUSY)
+					yield self.env.timeout(self.pack_time.draw())
+				self.timer.set(BLOCKED)
 				yield self.finished_stock.put(1)
+				if self.trace is not None:
+					self.trace.record(self.env.now, self.trace_id, PACKED)
 			
 			if self.finished_stock.level == self.finished_stock.capacity:
 				yield self.env.process(self.close_box())
 			
 	def build_box(self):
 		with self.operator.request() as opr:
+			self.timer.set(WAITING)
 			yield opr
-			yield self.env.timeout(max(10, normal(loc=G.BOX_BUILDTIME, scale=G.BOX_BUILDTIME_STDEV)))
+			self.timer.set(BUSY)
+			yield self.env.timeout(self.build_time.draw())
 			self.status = 'READY'
+			if self.trace is not None:
+				self.trace.record(self.env.now, self.trace_id, BOX_BUILT)
 	
 	def close_box(self):
 		with self.operator.request() as opr:
+			self.timer.set(WAITING)
 			yield opr
-			yield self.env.timeout(max(20, normal(loc=G.BOX_CLOSETIME, scale=G.BOX_CLOSETIME_STDEV)))
+			self.timer.set(BUSY)
+			yield self.env.timeout(self.close_time.draw())
 			self.status = 'NO BOX'
 		self.boxes += 1
 		if self.user_input == True:
 			print('Finished box number {0}'.format(self.boxes))
+		if self.trace is not None:
+			self.trace.record(self.env.now, self.trace_id, BOX_CLOSED, self.finished_stock.level)
 		self.finished_stock.get(self.finished_stock.level)
\ No newline at end of file
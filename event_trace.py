@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import numpy as np
+
+
+
+#Event types recorded by the equipment; the code stored in a trace is the index into `EVENT_NAMES`
+EVENT_NAMES = ('COMPLETED', 'LOADED', 'UNLOADED', 'CYCLE', 'FORMED', 'MOLD_LOADED', 'OVEN_LOADED',
+			   'LOAD_FAILED', 'PREEMPTED', 'BOX_BUILT', 'PACKED', 'BOX_CLOSED', 'BROKE_DOWN', 'REPAIRED')
+(COMPLETED, LOADED, UNLOADED, CYCLE, FORMED, MOLD_LOADED, OVEN_LOADED, LOAD_FAILED, PREEMPTED, BOX_BUILT, PACKED, BOX_CLOSED,
+ BROKE_DOWN, REPAIRED) = range(len(EVENT_NAMES))
+
+COLUMNS = (('time', np.float64), ('station', np.int16), ('event', np.int8), ('quantity', np.int32))
+
+
+class Event_Recorder(object):
+	#Collects (time, station, event, quantity) rows in preallocated arrays and writes them out as numbered
+	#	npz chunks in `directory` every `chunk_size` events. Equipment built without a recorder skips all of this.
+
+	def __init__(self, directory, chunk_size=65536):
+		self.directory = directory
+		self.chunk_size = chunk_size
+		self.stations = []
+		self.chunks = 0
+		self.events = 0
+		self.count = 0
+		self.time = np.empty(chunk_size, dtype=np.float64)
+		self.station = np.empty(chunk_size, dtype=np.int16)
+		self.event = np.empty(chunk_size, dtype=np.int8)
+		self.quantity = np.empty(chunk_size, dtype=np.int32)
+		os.makedirs(directory, exist_ok=True)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+	def station_id(self, name):
+		#Registers a station and returns the id stored in its rows
+		self.stations.append(name)
+		return len(self.stations) - 1
+
+	def record(self, time, station, event, quantity=1):
+		i = self.count
+		self.time[i] = time
+		self.station[i] = station
+		self.event[i] = event
+		self.quantity[i] = quantity
+		self.count = i + 1
+		if self.count == self.chunk_size:
+			self.flush()
+
+	def flush(self):
+		if self.count == 0:
+			return
+		n = self.count
+		np.savez(os.path.join(self.directory, 'chunk_{0:05d}.npz'.format(self.chunks)), time=self.time[:n],
+				 station=self.station[:n], event=self.event[:n], quantity=self.quantity[:n])
+		self.chunks += 1
+		self.events += n
+		self.count = 0
+
+	def close(self):
+		self.flush()
+		with open(os.path.join(self.directory, 'trace.json'), 'w') as f:
+			json.dump({'stations': self.stations, 'events': EVENT_NAMES, 'chunks': self.chunks, 'rows': self.events}, f)
+
+
+class Trace(object):
+	#A recorded trace read back from disk, one array per column plus the station and event names
+
+	def __init__(self, directory):
+		with open(os.path.join(directory, 'trace.json')) as f:
+			meta = json.load(f)
+		self.stations = meta['stations']
+		self.events = meta['events']
+		chunks = [np.load(os.path.join(directory, 'chunk_{0:05d}.npz'.format(i))) for i in range(meta['chunks'])]
+		for name, dtype in COLUMNS:
+			setattr(self, name, np.concatenate([chunk[name] for chunk in chunks]) if chunks else np.empty(0, dtype=dtype))
+
+	def __len__(self):
+		return len(self.time)
+
+	def select(self, station=None, event=None):
+		#Boolean mask of the rows for a station and/or event, given by name
+		mask = np.ones(len(self.time), dtype=bool)
+		if station is not None:
+			mask &= self.station == self.stations.index(station)
+		if event is not None:
+			mask &= self.event == self.events.index(event)
+		return mask
+
+	def replay(self):
+		#Yields rows in time order as (time, station name, event name, quantity)
+		for t, s, e, q in zip(self.time.tolist(), self.station.tolist(), self.event.tolist(), self.quantity.tolist()):
+			yield t, self.stations[s], self.events[e], q
+
+
+def load_trace(directory):
+	return Trace(directory)
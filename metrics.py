@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+
+
+#Equipment states tracked by `State_Timer`
+BUSY, BLOCKED, STARVED, WAITING, IDLE, DOWN = range(6)
+STATE_NAMES = ('busy', 'blocked', 'starved', 'waiting', 'idle', 'down')
+
+
+class State_Timer(object):
+	#Total time one piece of equipment has spent in each state. BUSY is time spent working, BLOCKED is waiting
+	#	to put into a full downstream buffer, STARVED is waiting on an empty upstream buffer and WAITING is
+	#	queueing for an operator or a shared station. DOWN is waiting on a repair with work to do.
+	__slots__ = ('env', 'state', 'since', 'totals')
+
+	def __init__(self, env, state=IDLE):
+		self.env = env
+		self.state = state
+		self.since = env.now
+		self.totals = [0.0] * len(STATE_NAMES)
+
+	def set(self, state):
+		now = self.env.now
+		self.totals[self.state] += now - self.since
+		self.state = state
+		self.since = now
+
+	def times(self):
+		#Time in each state up to now, including the state the equipment is in at the moment
+		times = list(self.totals)
+		times[self.state] += self.env.now - self.since
+		return times
+
+	def reset(self):
+		self.totals = [0.0] * len(STATE_NAMES)
+		self.since = self.env.now
+
+
+class Level_Accumulator(object):
+	#Time-weighted average of a value that changes in steps, such as a buffer level or a queue length
+	__slots__ = ('env', 'value', 'since', 'start', 'area', 'peak')
+
+	def __init__(self, env, value=0):
+		self.env = env
+		self.value = value
+		self.since = env.now
+		self.start = env.now
+		self.area = 0.0
+		self.peak = value
+
+	def update(self, value):
+		now = self.env.now
+		self.area += self.value * (now - self.since)
+		self.since = now
+		self.value = value
+		if value > self.peak:
+			self.peak = value
+
+	def mean(self):
+		now = self.env.now
+		if now == self.start:
+			return self.value
+		return (self.area + self.value * (now - self.since)) / (now - self.start)
+
+	def reset(self):
+		self.area = 0.0
+		self.since = self.start = self.env.now
+		self.peak = self.value
+
+
+class Wait_Accumulator(object):
+	#Count, mean and maximum of a stream of waiting times
+	__slots__ = ('count', 'total', 'peak')
+
+	def __init__(self):
+		self.reset()
+
+	def add(self, wait):
+		self.count += 1
+		self.total += wait
+		if wait > self.peak:
+			self.peak = wait
+
+	def mean(self):
+		return self.total / self.count if self.count else 0.0
+
+	def reset(self):
+		self.count = 0
+		self.total = 0.0
+		self.peak = 0.0
+
+
+class Station_Metrics(object):
+	#`breakdowns` and `downtime` (total repair time, whether or not the station had work waiting) are only
+	#	counted for machines that can break down; `availability` is the share of the time they weren't down.
+
+	def __init__(self, name, times, breakdowns=None):
+		self.name = name
+		self.elapsed = sum(times)
+		for state, time in zip(STATE_NAMES, times):
+			setattr(self, state, time)
+		self.breakdowns = breakdowns.count if breakdowns is not None else 0
+		self.downtime = breakdowns.down_time() if breakdowns is not None else 0.0
+		self.availability = 1 - self.downtime / self.elapsed if self.elapsed else 1.0
+
+	def fraction(self, state):
+		return getattr(self, state) / self.elapsed if self.elapsed else 0.0
+
+
+class Operator_Metrics(object):
+
+	def __init__(self, name, operator):
+		self.name = name
+		self.capacity = operator.capacity
+		self.utilization = operator.in_use.mean() / operator.capacity
+		self.mean_queue = operator.queue_length.mean()
+		self.max_queue = operator.queue_length.peak
+		self.requests = operator.waits.count
+		self.mean_wait = operator.waits.mean()
+		self.max_wait = operator.waits.peak
+
+
+class Buffer_Metrics(object):
+
+	def __init__(self, name, buffer):
+		self.name = name
+		self.capacity = buffer.capacity
+		self.mean_level = buffer.levels.mean()
+		self.max_level = buffer.levels.peak
+		self.puts = buffer.put_waits.count
+		self.mean_put_wait = buffer.put_waits.mean()
+		self.max_put_wait = buffer.put_waits.peak
+		self.gets = buffer.get_waits.count
+		self.mean_get_wait = buffer.get_waits.mean()
+		self.max_get_wait = buffer.get_waits.peak
+
+
+class Cell_Metrics(object):
+	#Snapshot of the instrumentation in a built `Cell`: per-station state times, per-operator pool queueing
+	#	and per-buffer levels and waits. Pools shared through a fallback are only reported once.
+
+	def __init__(self, cell):
+		self.elapsed = cell.env.now
+		self.stations = {name: Station_Metrics(name, station.timer.times(), getattr(station, 'breakdowns', None))
+						 for name, station in cell.stations.items()}
+		self.operators = {}
+		seen = set()
+		for name, operator in cell.operators.items():
+			if id(operator) not in seen:
+				seen.add(id(operator))
+				self.operators[name] = Operator_Metrics(name, operator)
+		self.buffers = {name: Buffer_Metrics(name, buffer) for name, buffer in cell.buffers.items()}
+
+	def bottleneck(self):
+		#The station that spends the largest share of its time busy
+		return max(self.stations.values(), key=lambda station: station.fraction('busy'))
+
+	def print_out(self):
+		print('Station utilization over {0:.0f}s:'.format(self.elapsed))
+		for station in self.stations.values():
+			print('\t{0:<20} '.format(station.name) + '  '.join('{0} {1:5.1%}'.format(state, station.fraction(state))
+																for state in STATE_NAMES))
+		print('Operators:')
+		for operator in self.operators.values():
+			print('\t{0:<20} utilization {1:5.1%}  mean queue {2:.2f}  mean wait {3:.1f}s  max wait {4:.1f}s'.format(
+				operator.name, operator.utilization, operator.mean_queue, operator.mean_wait, operator.max_wait))
+		print('Buffers:')
+		for buffer in self.buffers.values():
+			print('\t{0:<20} mean level {1:.2f}/{2}  mean put wait {3:.1f}s  mean get wait {4:.1f}s'.format(
+				buffer.name, buffer.mean_level, buffer.capacity, buffer.mean_put_wait, buffer.mean_get_wait))
+		down = [station for station in self.stations.values() if station.breakdowns]
+		if down:
+			print('Breakdowns:')
+			for station in down:
+				print('\t{0:<20} {1:4} breakdowns  downtime {2:8.0f}s  availability {3:5.1%}  lost to repairs {4:5.1%}'.format(
+					station.name, station.breakdowns, station.downtime, station.availability, station.fraction('down')))
+		print('Bottleneck: {0}'.format(self.bottleneck().name))
+
+
+class Level_Series(object):
+	#Sampled container levels: `times` has one entry per sample and `levels` one column per container in `names`
+
+	def __init__(self, names, times, levels, interval):
+		self.names = names
+		self.times = times
+		self.levels = levels
+		self.interval = interval
+
+	def column(self, name):
+		return self.levels[:, self.names.index(name)]
+
+
+class Level_Sampler(object):
+	#Samples the level of each container every `interval` seconds of simulation time into a fixed-size array.
+	#	When the array fills up every other sample is dropped and the interval doubles, so a run of any length
+	#	fits in `capacity` rows at the finest resolution that fits.
+
+	def __init__(self, env, containers, interval=60, capacity=4096):
+		self.env = env
+		self.names = list(containers)
+		self.containers = [containers[name] for name in self.names]
+		self.interval = interval
+		self.capacity = capacity - capacity % 2
+		self.times = np.empty(self.capacity, dtype=np.float64)
+		self.levels = np.empty((self.capacity, len(self.containers)), dtype=np.float64)
+		self.count = 0
+		self.process = env.process(self.run())
+
+	@classmethod
+	def for_cell(cls, cell, interval=60, capacity=4096):
+		#Samples every buffer in `cell` plus the oven and mold of each thermoformer
+		containers = dict(cell.buffers)
+		for thermoformer in cell.of_type('thermoformer'):
+			containers['{0} oven_stock'.format(thermoformer.name)] = thermoformer.oven_stock
+			containers['{0} mold_stock'.format(thermoformer.name)] = thermoformer.mold_stock
+		return cls(cell.env, containers, interval, capacity)
+
+	def run(self):
+		while True:
+			if self.count == self.capacity:
+				self.downsample()
+			self.times[self.count] = self.env.now
+			self.levels[self.count] = [container.level for container in self.containers]
+			self.count += 1
+			yield self.env.timeout(self.interval)
+
+	def downsample(self):
+		half = self.count // 2
+		self.times[:half] = self.times[0:self.count:2]
+		self.levels[:half] = self.levels[0:self.count:2]
+		self.count = half
+		self.interval *= 2
+
+	def series(self):
+		#Copy of the samples so far, detached from the simulation
+		return Level_Series(list(self.names), self.times[:self.count].copy(), self.levels[:self.count].copy(), self.interval)
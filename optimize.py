@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+from math import sqrt
+from .constants import SimConfig
+from .tesla import run_point
+
+
+
+GOLDEN_RATIO = (sqrt(5) - 1) / 2
+
+
+class Cycle_Search(object):
+	#Scores thermoformer cycle times for the optimizer. Every cycle time is run with the same seed so that
+	#	neighbouring points see the same random durations, and results are memoised so no point is run twice.
+	#	Replications stop early on a cycle time that is clearly worse than the best one scored so far.
+
+	def __init__(self, config, seed, replications=1, precision=0.01):
+		self.config = config
+		self.seed = seed
+		self.replications = replications
+		self.precision = precision
+		self.settings = {}
+		self.simulations = 0
+
+	def evaluate(self, cycle):
+		if cycle not in self.settings:
+			threshold = self.best().cost_factor if self.settings else None
+			setting = run_point(self.config.replace(THERMOFORMER_RUNTIME=cycle), self.seed, self.replications, self.precision,
+								threshold=threshold)
+			self.simulations += setting.replications
+			self.settings[cycle] = setting
+		return self.settings[cycle].cost_factor
+
+	def best(self):
+		return max(self.settings.values(), key=lambda setting: setting.cost_factor)
+
+
+def golden_section(search, low, high, tolerance):
+	#Narrows [low, high] around the maximum cost_factor until it is narrower than `tolerance`
+	c = high - GOLDEN_RATIO * (high - low)
+	d = low + GOLDEN_RATIO * (high - low)
+	fc = search.evaluate(c)
+	fd = search.evaluate(d)
+	while high - low > tolerance:
+		if fc >= fd:
+			high, d, fd = d, c, fc
+			c = high - GOLDEN_RATIO * (high - low)
+			fc = search.evaluate(c)
+		else:
+			low, c, fc = c, d, fd
+			d = low + GOLDEN_RATIO * (high - low)
+			fd = search.evaluate(d)
+
+
+def optimize_cycle(min_cycle, max_cycle, config=None, seed=None, coarse_steps=8, tolerance=1.0,
+				   replications=1, precision=0.01, grid_steps=100):
+	#Coarse-to-fine search for the cycle time with the best `Setting.cost_factor`. A coarse grid of
+	#	`coarse_steps` intervals finds the neighbourhood of the optimum, then a golden-section search narrows
+	#	it down to `tolerance` seconds. Returns the best `Setting`, with the number of simulations it took
+	#	stored on it as `simulations`.
+	if config is None:
+		config = SimConfig()
+	search = Cycle_Search(config, config.SEED if seed is None else seed, replications, precision)
+
+	step_size = (max_cycle - min_cycle) / coarse_steps
+	grid = [min_cycle + i * step_size for i in range(coarse_steps + 1)]
+	scores = [search.evaluate(cycle) for cycle in grid]
+	best = scores.index(max(scores))
+	golden_section(search, grid[max(0, best - 1)], grid[min(coarse_steps, best + 1)], tolerance)
+
+	best_setting = search.best()
+	best_setting.simulations = search.simulations
+	grid_simulations = grid_steps * replications
+	print('Optimizer took {0} simulations, a {1} point grid would take up to {2} ({3:.0%})'.format(
+		search.simulations, grid_steps, grid_simulations, search.simulations / grid_simulations))
+	best_setting.print_out()
+	return best_setting
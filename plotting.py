@@ -1,12 +1,32 @@
 #!/usr/bin/env python3
 
-import matplotlib
-import matplotlib.pyplot as plt
+import sys
+import time
 from .constants import G
 
 
 
-def cost_plot(cycle_times_arr, cost_arr, pcs_arr, failures, wip, best, title=None):
+#Size in inches and resolution of exported figures, matching the PNGs in plots/
+FIGURE_SIZE = (10.74, 7.3)
+FIGURE_DPI = 100
+
+
+def _pyplot(headless=False):
+	#Imports pyplot on first use so that running the simulation never loads matplotlib. Headless plots select
+	#	the Agg backend first, unless pyplot has already been loaded with another backend.
+	if headless and 'matplotlib.pyplot' not in sys.modules:
+		import matplotlib
+		matplotlib.use('Agg')
+	import matplotlib.pyplot as plt
+	return plt
+
+
+def cost_plot(cycle_times_arr, cost_arr, pcs_arr, failures, wip, best, title=None, sim_time=G.SIMULATION_TIME, path=None, keep_open=True):
+	#Plots a cycle time sweep. With `path` the figure is written to that file and closed without needing a
+	#	display; otherwise it is shown, blocking until the window is closed unless `keep_open` is False.
+	plt = _pyplot(headless=path is not None)
+	if path is not None:
+		fig = plt.figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
 	if title != None:
 		plt.suptitle(title)
 	
@@ -19,7 +39,7 @@ def cost_plot(cycle_times_arr, cost_arr, pcs_arr, failures, wip, best, title=Non
 	plt.subplot(222)
 	plt.plot(cycle_times_arr, pcs_arr)
 	plt.axvline(x=best, color='r', linestyle='dashed')
-	plt.ylabel("Pieces Produced per {0}s".format(G.SIMULATION_TIME))
+	plt.ylabel("Pieces Produced per {0}s".format(sim_time))
 	plt.xlabel("Cycle Times")
 
 	plt.subplot(223)
@@ -36,8 +56,49 @@ def cost_plot(cycle_times_arr, cost_arr, pcs_arr, failures, wip, best, title=Non
 	
 	plt.subplots_adjust(left=0.2, wspace=0.8, top=0.8)
 	
-	keep_open=True
+	if path is not None:
+		fig.savefig(path)
+		plt.close(fig)
+		return
 	plt.show(block=keep_open)	#block=False to exit out of plots
 	if keep_open==False:
 		time.sleep(5)
-		plt.close()
\ No newline at end of file
+		plt.close()
+
+
+def level_plot(series, names=None, title=None, keep_open=True):
+	#Plots sampled container levels (a `metrics.Level_Series`) against simulation time in hours
+	plt = _pyplot()
+	if title != None:
+		plt.suptitle(title)
+	for name in (series.names if names is None else names):
+		plt.step(series.times / 3600, series.column(name), where='post', label=name)
+	plt.ylabel("Level (pcs)")
+	plt.xlabel("Simulation time (hr)")
+	plt.legend(loc='upper left', fontsize='small')
+	plt.show(block=keep_open)
+
+
+def stream_level_plot(cell, sampler, until, step=3600, names=None, title=None):
+	#Runs `cell` forward `step` seconds at a time up to `until`, redrawing the levels recorded by `sampler`
+	#	(a `metrics.Level_Sampler`) after each step so WIP build-up can be watched while the run goes
+	plt = _pyplot()
+	plt.ion()
+	if title != None:
+		plt.suptitle(title)
+	names = sampler.names if names is None else names
+	columns = [sampler.names.index(name) for name in names]
+	lines = [plt.step([], [], where='post', label=name)[0] for name in names]
+	plt.ylabel("Level (pcs)")
+	plt.xlabel("Simulation time (hr)")
+	plt.legend(loc='upper left', fontsize='small')
+	
+	while cell.env.now < until:
+		cell.run(until=min(until, cell.env.now + step))
+		times = sampler.times[:sampler.count] / 3600
+		for line, column in zip(lines, columns):
+			line.set_data(times, sampler.levels[:sampler.count, column])
+		plt.gca().relim()
+		plt.gca().autoscale_view()
+		plt.pause(0.001)
+	plt.ioff()
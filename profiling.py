@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+from time import perf_counter
+import simpy
+
+
+
+#Charged for steps that resume no process, e.g. an event nothing is waiting on
+NO_PROCESS = '(no process)'
+
+
+class Profiling_Environment(simpy.Environment):
+	#Environment that times every step and charges it to the event type and the generators it resumes, e.g.
+	#	`Load_Station.load_sheet`; `yield from` steps are charged to their caller. `costs` maps (generator, event
+	#	type) and `stations` maps station name to [event count, wall seconds].
+
+	def __init__(self, initial_time=0):
+		super().__init__(initial_time)
+		self.costs = {}
+		self.stations = {}
+
+	def step(self):
+		if not self._queue:
+			return super().step()
+		event = self._queue[0][3]
+		kind = type(event).__name__
+		labels = []
+		for callback in event.callbacks or ():
+			process = getattr(callback, '__self__', None)
+			if isinstance(process, simpy.Process):
+				generator = process._generator
+				frame = generator.gi_frame
+				station = frame.f_locals.get('self') if frame is not None else None
+				labels.append((generator.__qualname__, getattr(station, 'name', None)))
+		start = perf_counter()
+		try:
+			super().step()
+		finally:
+			elapsed = perf_counter() - start
+			if not labels:
+				labels.append((NO_PROCESS, None))
+			share = elapsed / len(labels)
+			for generator, station in labels:
+				cost = self.costs.setdefault((generator, kind), [0, 0.0])
+				cost[0] += 1
+				cost[1] += share
+				if station is not None:
+					cost = self.stations.setdefault(station, [0, 0.0])
+					cost[0] += 1
+					cost[1] += share
+
+
+def _totals(costs, index):
+	totals = {}
+	for key, (count, seconds) in costs.items():
+		total = totals.setdefault(key[index], [0, 0.0])
+		total[0] += count
+		total[1] += seconds
+	return sorted(totals.items(), key=lambda item: item[1][1], reverse=True)
+
+
+class Profile_Report(object):
+	#Where the wall time of a profiled run went, ranked by generator, by event type and by station. `wall` is
+	#	the whole run, so the gap between it and the profiled steps is the profiler's own overhead.
+
+	def __init__(self, env, wall):
+		self.wall = wall
+		self.costs = dict(env.costs)
+		self.profiled = sum(seconds for count, seconds in self.costs.values())
+		self.events = sum(count for count, seconds in self.costs.values())
+		self.generators = _totals(self.costs, 0)
+		self.event_types = _totals(self.costs, 1)
+		self.stations = sorted(env.stations.items(), key=lambda item: item[1][1], reverse=True)
+
+	def _print_table(self, title, rows, top):
+		print(title)
+		for name, (count, seconds) in rows[:top]:
+			print('\t{0:<32} {1:9.1f}ms {2:6.1%} {3:9} events {4:7.2f}us/event'.format(name, seconds * 1000,
+				seconds / self.profiled if self.profiled else 0.0, count, seconds / count * 1e6 if count else 0.0))
+
+	def print_out(self, top=15):
+		print('Profiled {0} events, {1:.3f}s of {2:.3f}s wall time spent in steps'.format(self.events, self.profiled, self.wall))
+		self._print_table('By generator:', self.generators, top)
+		self._print_table('By event type:', self.event_types, top)
+		self._print_table('By station:', self.stations, top)
+
+	def write_folded(self, path):
+		#Writes `generator;event type microseconds` lines, the folded stack format read by flamegraph.pl
+		#	and speedscope
+		with open(path, 'w') as f:
+			for (generator, kind), (count, seconds) in sorted(self.costs.items()):
+				f.write('{0};{1} {2}\n'.format(generator, kind, int(round(seconds * 1e6))))
+
+
+def profile_run(cell, cprofile=None, until=None):
+	#Runs `cell`, which must have been built on a `Profiling_Environment`, and returns its `Profile_Report`.
+	#	With `cprofile` set to a path the run is also recorded by cProfile and the stats written there, for
+	#	pstats, snakeviz or flameprof.
+	if not isinstance(cell.env, Profiling_Environment):
+		raise TypeError('profile_run() needs a cell built on a Profiling_Environment')
+	if cprofile is not None:
+		import cProfile
+		profiler = cProfile.Profile()
+		profiler.enable()
+	start = perf_counter()
+	try:
+		cell.run(until)
+	finally:
+		wall = perf_counter() - start
+		if cprofile is not None:
+			profiler.disable()
+			profiler.dump_stats(cprofile)
+	return Profile_Report(cell.env, wall)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+from math import sqrt
+from numpy.random import SeedSequence
+from .constants import SimConfig
+from .tesla import main, Setting
+
+
+
+#Two-sided Student t critical values for 1-30 degrees of freedom, keyed by confidence level
+T_TABLE = {
+	0.90: (6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812, 1.796, 1.782, 1.771, 1.761, 1.753,
+		   1.746, 1.740, 1.734, 1.729, 1.725, 1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697),
+	0.95: (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228, 2.201, 2.179, 2.160, 2.145, 2.131,
+		   2.120, 2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042),
+	0.99: (63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169, 3.106, 3.055, 3.012, 2.977, 2.947,
+		   2.921, 2.898, 2.878, 2.861, 2.845, 2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750),
+}
+Z_TABLE = {0.90: 1.645, 0.95: 1.960, 0.99: 2.576}
+
+METRICS = ('pcs', 'failures', 'wip', 'cost', 'cost_factor')
+
+
+def t_critical(df, confidence=0.95):
+	if confidence not in T_TABLE:
+		raise ValueError('confidence must be one of {0}'.format(sorted(T_TABLE)))
+	if df <= len(T_TABLE[confidence]):
+		return T_TABLE[confidence][df - 1]
+	#Cornish-Fisher correction to the normal quantile is plenty past the end of the table
+	z = Z_TABLE[confidence]
+	return z + (z ** 3 + z) / (4 * df)
+
+
+class Estimate(object):
+	#Sample mean and confidence interval of one output metric over a set of replications
+
+	def __init__(self, values, confidence=0.95):
+		self.n = len(values)
+		self.mean = sum(values) / self.n
+		if self.n > 1:
+			self.stdev = sqrt(sum((v - self.mean) ** 2 for v in values) / (self.n - 1))
+			self.half_width = t_critical(self.n - 1, confidence) * self.stdev / sqrt(self.n)
+		else:
+			self.stdev = float('nan')
+			self.half_width = float('inf')
+		self.low = self.mean - self.half_width
+		self.high = self.mean + self.half_width
+
+	def relative_half_width(self):
+		if self.mean == 0:
+			return 0 if self.half_width == 0 else float('inf')
+		return abs(self.half_width / self.mean)
+
+	def __repr__(self):
+		return '{0:.4g} +/- {1:.3g}'.format(self.mean, self.half_width)
+
+
+class Replication_Result(object):
+	#Outcome of `replicate()`: an `Estimate` for each of pcs, failures, wip, cost and cost_factor.
+
+	#	`below_threshold` is set when `replicate()` gave up on the setting as clearly worse than its threshold.
+
+	def __init__(self, config, samples, confidence=0.95, below_threshold=False):
+		self.config = config
+		self.samples = samples
+		self.confidence = confidence
+		self.below_threshold = below_threshold
+		self.replications = len(samples['pcs'])
+		for metric in METRICS:
+			setattr(self, metric, Estimate(samples[metric], confidence))
+
+	def setting(self):
+		#Mean results as a `Setting`, so replicated points compare the same way as single runs. The cost weights
+		#	it carries let `Results_Table.score()` re-price the mean annual cost without the samples.
+		pcs = self.samples['pcs']
+		material_weight = sum(p / max(1, p) for p in pcs) / len(pcs)
+		labor_weight = sum(1 / max(1, p) for p in pcs) / len(pcs)
+		cost = self.cost.mean if self.replications == 1 else self.config.mean_annual_cost(material_weight, labor_weight)
+		setting = Setting(self.config.THERMOFORMER_RUNTIME, cost, self.pcs.mean, self.wip.mean,
+						  self.failures.mean, sim_time=self.config.SIMULATION_TIME)
+		setting.replications = self.replications
+		setting.cost_weights = (material_weight, labor_weight)
+		return setting
+
+	def print_out(self):
+		print("""{0} replications at a {1}s cycle ({2:.0%} confidence):
+	Annual cost to run: {3}
+	Pieces produced: {4}
+	Cycle failures: {5}
+	Remaining WIP in the cell: {6}""".format(self.replications, self.config.THERMOFORMER_RUNTIME, self.confidence,
+			self.cost, self.pcs, self.failures, self.wip))
+
+
+def replication_seeds(seed, count):
+	#Independent seeds for each replication, reproducible from a single `seed`
+	return [int(s) for s in SeedSequence(seed).generate_state(count)]
+
+
+def replicate(config=None, seed=None, min_replications=3, max_replications=30, precision=0.01,
+			  confidence=0.95, threshold=None, topology=None, start=None):
+	#Runs seeded replications of `main()` until the cost and pieces estimates are within `precision` or the
+	#	cost_factor interval falls below `threshold`. `start` carries on from an earlier `Replication_Result`
+	#	for the same config and seed, giving the same result as one longer call.
+	if config is None:
+		config = SimConfig()
+	min_replications = max(1, min(min_replications, max_replications))
+	seeds = replication_seeds(config.SEED if seed is None else seed, max_replications)
+	samples = {metric: [] for metric in METRICS}
+	if start is not None:
+		for metric in METRICS:
+			samples[metric].extend(start.samples[metric])
+		if len(samples['pcs']) >= min_replications:
+			result = Replication_Result(config, samples, confidence)
+			if threshold is not None and result.cost_factor.high < threshold:
+				result.below_threshold = True
+				return result
+			if result.cost.relative_half_width() <= precision and result.pcs.relative_half_width() <= precision:
+				return result
+
+	for i in range(len(samples['pcs']), max_replications):
+		pcs, failures, wip = main(config=config, seed=seeds[i], topology=topology)
+		cost = config.annual_cost(pcs)
+		samples['pcs'].append(pcs)
+		samples['failures'].append(failures)
+		samples['wip'].append(wip)
+		samples['cost'].append(cost)
+		samples['cost_factor'].append(Setting(config.THERMOFORMER_RUNTIME, cost, pcs, wip, failures).cost_factor)
+
+		if i + 1 < min_replications:
+			continue
+		result = Replication_Result(config, samples, confidence)
+		if threshold is not None and result.cost_factor.high < threshold:
+			result.below_threshold = True
+			return result
+		if result.cost.relative_half_width() <= precision and result.pcs.relative_half_width() <= precision:
+			return result
+
+	return Replication_Result(config, samples, confidence)
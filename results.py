@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from .constants import G
+
+
+
+#Columns of a `Results_Table`: what was run, what it produced, and the scores worked out from those. The
+#	weights are the means of pcs / max(1, pcs) and 1 / max(1, pcs) over a point's replications, which is what
+#	the mean annual cost of a replicated point depends on besides the prices.
+RESULT_DTYPE = np.dtype([
+	('cycle', np.float64),
+	('main_operators', np.int32),
+	('support_operators', np.int32),
+	('routers', np.int32),
+	('sheeters', np.int32),
+	('sim_time', np.float64),
+	('replications', np.int32),
+	('pcs', np.float64),
+	('failures', np.float64),
+	('wip', np.float64),
+	('material_weight', np.float64),
+	('labor_weight', np.float64),
+	('run_cost', np.float64),
+	('cost', np.float64),
+	('cost_factor', np.float64),
+])
+
+#Constants the scores depend on; `score()` and `reweight()` can override any of them
+PRICE_FIELDS = ('SHEET_COST', 'BOX_COST', 'OPERATOR_RATE', 'MACHINE_RATE', 'OVERHEAD_RATE', 'EAU')
+
+
+class Results_Table(object):
+	#Scored sweep points in one NumPy structured array, one row per `Setting`. `score()` prices every row at
+	#	once with the `SimConfig` cost formulas, so points can be re-priced without simulating them again.
+	#	Replicated rows are priced from their cost weights, i.e. the mean of the per-replication costs.
+
+	def __init__(self, rows=None, prices=None, capacity=256):
+		if rows is None:
+			rows = np.zeros(capacity, dtype=RESULT_DTYPE)
+			self.count = 0
+		else:
+			rows = np.asarray(rows, dtype=RESULT_DTYPE)
+			self.count = len(rows)
+		self._rows = rows
+		self.prices = {name: getattr(G, name) for name in PRICE_FIELDS}
+		if prices is not None:
+			self.prices.update(prices)
+
+	@classmethod
+	def from_settings(cls, settings, configs):
+		table = cls(capacity=max(1, len(settings)))
+		for setting, config in zip(settings, configs):
+			table.append(setting, config)
+		return table
+
+	@property
+	def rows(self):
+		return self._rows[:self.count]
+
+	def __len__(self):
+		return self.count
+
+	def __getitem__(self, key):
+		#A column by name, or rows by index, slice or boolean mask
+		return self.rows[key]
+
+	def append(self, setting, config):
+		#Adds a scored `Setting` from a run of `config`; the scores are copied from the setting as they are
+		if self.count == len(self._rows):
+			grown = np.zeros(max(1, 2 * len(self._rows)), dtype=RESULT_DTYPE)
+			grown[:self.count] = self._rows
+			self._rows = grown
+		if self.count == 0:
+			self.prices = {name: getattr(config, name) for name in PRICE_FIELDS}
+		material_weight, labor_weight = getattr(setting, 'cost_weights', cost_weights(setting.pcs))
+		self._rows[self.count] = (setting.cycle, config.MAIN_OPERATORS, config.SUPPORT_OPERATORS, config.ROUTERS, config.SHEETERS,
+								  setting.sim_time, setting.replications, setting.pcs, setting.failures, setting.wip,
+								  material_weight, labor_weight, config.run_cost(setting.pcs), setting.cost, setting.cost_factor)
+		self.count += 1
+
+	def score(self, **prices):
+		#Recomputes `run_cost`, `cost` and `cost_factor` for every row, after applying any `prices` overrides
+		unknown = set(prices) - set(PRICE_FIELDS)
+		if unknown:
+			raise TypeError('Unknown price constants: {0}'.format(', '.join(sorted(unknown))))
+		self.prices.update(prices)
+		p = self.prices
+		rows = self.rows
+		operators = rows['main_operators'] + rows['support_operators']
+		labor_rate = p['MACHINE_RATE'] + p['OVERHEAD_RATE'] + operators * p['OPERATOR_RATE']
+		unit_material_cost = p['SHEET_COST'] + p['BOX_COST']
+		run_labor_cost = rows['sim_time'] / 3600 * labor_rate
+		rows['run_cost'] = rows['pcs'] * unit_material_cost + run_labor_cost
+		rows['cost'] = np.where(rows['replications'] > 1,
+								p['EAU'] * (rows['material_weight'] * unit_material_cost + rows['labor_weight'] * run_labor_cost),
+								p['EAU'] / np.maximum(1, rows['pcs']) * rows['run_cost'])
+		with np.errstate(divide='ignore'):
+			cost_factor = 960000 / rows['cost'] * 1.5 + 1 / (rows['wip'] + 10) * .01 + 1 / (rows['failures'] + 1) * .02
+		rows['cost_factor'] = np.where(rows['cost'] == 0, 0, cost_factor)
+		return self
+
+	def reweight(self, **prices):
+		#Copy of the table scored with `prices` overrides; this table is left as it is
+		return Results_Table(self.rows.copy(), self.prices).score(**prices)
+
+	def best(self):
+		#Index of the row with the highest `cost_factor`; the first one on a tie
+		return int(np.argmax(self.rows['cost_factor']))
+
+	def top(self, k):
+		#Indices of the `k` rows with the highest `cost_factor`, best first; ties keep row order, like `best()`
+		return np.argsort(-self.rows['cost_factor'], kind='stable')[:k]
+
+	def filter(self, mask):
+		#New table with only the rows where `mask` is true, e.g. `table.filter(table['failures'] < 10)`
+		return Results_Table(self.rows[mask], self.prices)
+
+	def setting(self, index):
+		#The row at `index` as a `Setting`
+		from .tesla import Setting
+		row = self.rows[index]
+		setting = Setting(float(row['cycle']), float(row['cost']), float(row['pcs']), float(row['wip']), float(row['failures']),
+						  sim_time=float(row['sim_time']))
+		setting.replications = int(row['replications'])
+		return setting
+
+	def to_csv(self, path):
+		formats = ['%d' if RESULT_DTYPE[name].kind == 'i' else '%.10g' for name in RESULT_DTYPE.names]
+		np.savetxt(path, self.rows, fmt=formats, delimiter=',', header=','.join(RESULT_DTYPE.names), comments='')
+
+	def to_npz(self, path):
+		np.savez_compressed(path, rows=self.rows, **{name: np.float64(value) for name, value in self.prices.items()})
+
+
+def cost_weights(pcs):
+	#Cost weights of a single run making `pcs` parts
+	return pcs / max(1, pcs), 1 / max(1, pcs)
+
+
+def load_results(path):
+	#Reads a table written by `Results_Table.to_npz()`
+	with np.load(path) as data:
+		prices = {name: float(data[name]) for name in PRICE_FIELDS if name in data}
+		return Results_Table(data['rows'], prices)
+
+
+def merge_results(tables):
+	#One table with the rows of every table in `tables`, e.g. the shards of a sweep, in descending cycle time
+	#	order as `cost_sim()` visits them. Prices are taken from the first table.
+	rows = np.concatenate([table.rows for table in tables])
+	rows = rows[np.argsort(-rows['cycle'], kind='stable')]
+	return Results_Table(rows, tables[0].prices if tables else None)
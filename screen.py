@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+from math import comb, erfc, exp, sqrt
+from .constants import SimConfig
+from .topology import compile_topology, resolve
+
+
+
+#Calibration of the flow model's operator waits, fitted to `main()` runs over 45-131s cycle times (see README).
+#	A request waits with probability (utilization by the rest of the pool) ** (sqrt(2 * (servers + 1)) - 1), and
+#	then for the pool's mean residual service time over (1 - utilization) ** WAIT_EXPONENT, times the scale.
+LOAD_WAIT_SCALE = 0.1			#scale for the load station's requests
+STATION_WAIT_SCALE = 0.1		#scale for every other station's requests
+WAIT_EXPONENT = 1.5
+MAX_UTILIZATION = 0.95			#pools above this are treated as saturated
+WAIT_ITERATIONS = 6
+#Sheets lost per failed cycle, to a load started by an extra load station loop and preempted at the cycle end
+SHEETS_LOST = 1.0
+#Share of a load that is done, on average, when the thermoformer preempts it
+PREEMPTED_SHARE = 0.5
+
+
+def _normal_sf(x):
+	#P(Z > x) for a standard normal Z
+	return 0.5 * erfc(x / sqrt(2))
+
+
+def _gamma_sf(k, x):
+	#P(X > x) for X the sum of `k` unit mean exponentials
+	if x <= 0:
+		return 1.0
+	term = total = 1.0
+	for i in range(1, k):
+		term *= x / i
+		total += term
+	return exp(-x) * total
+
+
+def _late(requests, work, stdev, window, p_wait, wait):
+	#P(`work` seconds of steps with `stdev`, plus the operator waits of `requests` requests, overrun `window`).
+	#	Each request waits with probability `p_wait`, for an exponential time with mean `wait`.
+	late = 0.0
+	for waits in range(requests + 1):
+		weight = comb(requests, waits) * p_wait ** waits * (1 - p_wait) ** (requests - waits)
+		if waits == 0 or wait <= 0:
+			late += weight * _normal_sf((window - work) / stdev)
+		else:
+			late += weight * _gamma_sf(waits, (window - work) / wait)
+	return late
+
+
+def _paced(slack, spacing, p_wait, wait):
+	#P(phase + W <= slack), for the phase of the next sheet uniform over `spacing` and W the last load's operator wait
+	if slack <= 0:
+		return 0.0
+	span = min(spacing, slack)
+	if wait <= 0:
+		return span / spacing
+	return (span - p_wait * wait * (exp(-(slack - span) / wait) - exp(-slack / wait))) / spacing
+
+
+def _repair_factor(mtbf, mttr):
+	#Elapsed time per second of machine work for a machine with the given breakdowns
+	return (mtbf + mttr) / mtbf if mtbf > 0 else 1.0
+
+
+def cycle_work(config):
+	#Mean {type: (machine seconds, operator seconds, operator requests)} one successful thermoformer cycle creates,
+	#	summed over the type's instances, and the pieces per cycle. Run times are stretched by breakdowns.
+	lsc = config.LOAD_STATION_CAPACITY
+	sheets = config.THERMOFORMER_YIELD
+	split = sheets / config.SPLITTER_CAPACITY
+	routed = split * config.SPLITTER_YIELD / config.ROUTER_CAPACITY
+	trimmed = routed * config.ROUTER_YIELD / config.TRIMMER_CAPACITY
+	drilled = trimmed * config.TRIMMER_YIELD / config.DRILLER_CAPACITY
+	pieces = drilled * config.DRILLER_YIELD
+	load = lsc * config.LOAD_STATION_LOAD_TIME + config.LOAD_STATION_UNLOAD_TIME
+	router = config.ROUTER_LOAD_TIME + config.ROUTER_UNLOAD_TIME
+	boxes = pieces / config.BOX_SIZE
+	box = boxes * (config.BOX_BUILDTIME + config.BOX_CLOSETIME)
+	sheeter = config.SHEETER_RUNTIME * _repair_factor(config.SHEETER_MTBF, config.SHEETER_MTTR)
+	thermoformer = config.THERMOFORMER_RUNTIME * _repair_factor(config.THERMOFORMER_MTBF, config.THERMOFORMER_MTTR)
+	routing = config.ROUTER_RUNTIME * _repair_factor(config.ROUTER_MTBF, config.ROUTER_MTTR)
+	trimming = config.TRIMMER_RUNTIME * _repair_factor(config.TRIMMER_MTBF, config.TRIMMER_MTTR)
+	drilling = config.DRILLER_RUNTIME * _repair_factor(config.DRILLER_MTBF, config.DRILLER_MTTR)
+	work = {
+		'sheeter': (lsc * sheeter / config.SHEETER_YIELD, 0.0, 0),
+		'load_station': (load, load, lsc + 1),
+		'thermoformer': (thermoformer, 0.0, 0),
+		'splitter': (split * config.SPLITTER_RUNTIME, split * config.SPLITTER_RUNTIME, split),
+		'router': (routed * (router + routing), routed * router, 2 * routed),
+		'hotwire_trimmer': (trimmed * trimming, trimmed * trimming, trimmed),
+		'driller': (drilled * drilling, drilled * drilling, drilled),
+		'boxer': (pieces * config.BOX_PACKTIME + box, box, 2 * boxes),
+	}
+	return work, pieces
+
+
+class Screen_Result(object):
+	#Estimate of a setting from `screen_point()`, on the same basis as a full `main()` run. `passed` is set by
+	#	`screen()`.
+
+	def __init__(self, config, pcs, failures, failure_probability, utilization, bottleneck):
+		self.config = config
+		self.pcs = pcs
+		self.failures = failures
+		self.failure_probability = failure_probability
+		self.utilization = utilization
+		self.bottleneck = bottleneck
+		self.cost = config.annual_cost(pcs)
+		self.passed = True
+
+
+def screen_point(config=None, topology=None):
+	#Flow approximation of the cell: stations and operator pools cap the successful cycle rate, and a cycle
+	#	fails when the load station can't unload and reload within it. The failure probability is the fixed
+	#	point of the two, found by bisection; see the README.
+	if config is None:
+		config = SimConfig()
+	topology = compile_topology(topology)
+	work, pieces = cycle_work(config)
+
+	capacities = {name: resolve(capacity, config) for name, (capacity, fallback) in topology.operators}
+	pools = {name: name if capacities[name] > 0 or fallback is None else fallback for name, (capacity, fallback) in topology.operators}
+	counts = {}
+	placed = []
+	for kind, name, connections in topology.plan(config):
+		counts[kind] = counts.get(kind, 0) + 1
+		placed.append((kind, pools[connections['operator'][1]] if 'operator' in connections else None))
+	ls_pool = dict(placed).get('load_station')
+	#(kind, pool, share) per station instance, `share` being its part of the work of its kind
+	stations = [(kind, pool, 1 / counts[kind]) for kind, pool in placed if kind not in ('thermoformer', 'load_station', 'sheeter')]
+	per_cycle = dict.fromkeys(capacities, 0.0)
+	for kind, pool, share in stations:
+		if pool is not None:
+			per_cycle[pool] += work[kind][1] * share
+
+	lsc = config.LOAD_STATION_CAPACITY
+	unload, load = config.LOAD_STATION_UNLOAD_TIME, config.LOAD_STATION_LOAD_TIME
+	window = work['thermoformer'][0]
+	attempts = counts.get('thermoformer', 1) / window
+	spacing = work['sheeter'][0] / lsc / counts['sheeter'] if counts.get('sheeter') else float('inf')
+	stdev_unload = sqrt(lsc * config.LOAD_STATION_LOAD_TIME_STDEV ** 2 + config.LOAD_STATION_UNLOAD_TIME_STDEV ** 2)
+	stdev_load = sqrt(lsc) * config.LOAD_STATION_LOAD_TIME_STDEV
+
+	def flows(success, waits):
+		#Successful cycle rate, its bound, and the operator load of the load station and of the rest of each pool
+		own = dict.fromkeys(capacities, 0.0)
+		if ls_pool is not None:
+			own[ls_pool] = attempts * (success * (unload + lsc * load) + (1 - success) * (lsc - PREEMPTED_SHARE) * load)
+		station_rates = {}
+		for kind, pool, share in stations:
+			machine, operator, requests = work[kind]
+			station_rates[kind] = station_rates.get(kind, 0.0) + 1 / (machine + requests * waits.get(pool, 0.0))
+		bounds = [(rate, kind) for kind, rate in station_rates.items()]
+		bounds += [(max(0.0, capacities[pool] - own[pool]) / per_cycle[pool], pool) for pool in capacities if per_cycle[pool] > 0]
+		capacity, bottleneck = min(bounds) if bounds else (attempts, 'thermoformer')
+		rate = min(attempts * success, capacity)
+		others = {pool: [0.0, 0.0] for pool in capacities}
+		for kind, pool, share in stations:
+			machine, operator, requests = work[kind]
+			if pool is not None and requests:
+				others[pool][0] += operator * share * rate
+				others[pool][1] += operator ** 2 / requests * share * rate
+		return rate, capacity, bottleneck, others, own
+
+	def pool_wait(pool, others, own, scale):
+		#(P(wait), mean wait when waiting) for a request on `pool` that never queues behind its own station
+		servers = capacities[pool]
+		busy, square = others[pool]
+		if servers <= 0 or busy <= 0:
+			return 0.0, 0.0
+		utilization = min(MAX_UTILIZATION, (busy + own[pool]) / servers)
+		p_wait = min(1.0, busy / servers) ** (sqrt(2 * (servers + 1)) - 1)
+		return p_wait, scale * square / busy / 2 / servers / (1 - utilization) ** WAIT_EXPONENT
+
+	def settle(success):
+		#`flows` at the operator waits they cause, found by damped iteration
+		waits = {}
+		for step in range(WAIT_ITERATIONS):
+			rate, capacity, bottleneck, others, own = flows(success, waits)
+			settled = {pool: p_wait * wait for pool, (p_wait, wait) in
+					   ((pool, pool_wait(pool, others, own, STATION_WAIT_SCALE)) for pool in capacities)}
+			waits = settled if step == 0 else {pool: (waits[pool] + settled[pool]) / 2 for pool in settled}
+		return rate, capacity, bottleneck, others, own
+
+	def evaluate(success):
+		#Success probability of a cycle implied by `success`, and whether the sheeters pace the loads
+		rate, capacity, bottleneck, others, own = settle(success)
+		p_wait, wait = pool_wait(ls_pool, others, own, LOAD_WAIT_SCALE) if ls_pool is not None else (0.0, 0.0)
+		with_unload = 1 - _late(lsc + 1, unload + lsc * load, stdev_unload, window, p_wait, wait)
+		without_unload = 1 - _late(lsc, lsc * load, stdev_load, window, p_wait, wait)
+		#A cycle needs an unload when the one two cycles before it succeeded
+		implied = without_unload / (1 - with_unload + without_unload) if without_unload > 0 else 0.0
+		paced = window / spacing < lsc + SHEETS_LOST * (1 - success)
+		if paced:
+			implied = min(implied, _paced(window - (lsc - 1) * spacing - load, spacing, p_wait, wait))
+		return implied, paced
+
+	low, high = 0.0, 1.0
+	for _ in range(12):
+		middle = (low + high) / 2
+		if evaluate(middle)[0] > middle:
+			low = middle
+		else:
+			high = middle
+	success = (low + high) / 2
+	paced = evaluate(success)[1]
+	rate, capacity, bottleneck, others, own = settle(success)
+	failure_probability = 1 - success
+	if attempts * success < capacity:
+		bottleneck = 'sheeter' if paced else 'thermoformer' if failure_probability < 0.5 else 'load_station'
+	utilization = {pool: (others[pool][0] + own[pool]) / capacities[pool] for pool in capacities if capacities[pool] > 0}
+	return Screen_Result(config, pieces * rate * config.SIMULATION_TIME, attempts * failure_probability * config.SIMULATION_TIME,
+						 failure_probability, utilization, bottleneck)
+
+
+def screen(configs, margin=0.05, max_failure=0.5, topology=None):
+	#Screens every config in `configs` and marks the ones worth a full simulation as `passed`: those whose
+	#	estimated annual cost is within `margin` of the best estimate and whose cycles fail with probability
+	#	at most `max_failure`. Returns the `Screen_Result` of every config, in order.
+	results = [screen_point(config, topology) for config in configs]
+	best = min(result.cost for result in results)
+	for result in results:
+		result.passed = result.cost <= best * (1 + margin) and result.failure_probability <= max_failure
+	return results
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import copy
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import simpy
+from .constants import SimConfig
+from .tesla import build_cell, sweep_cycles, Setting
+
+
+
+#Station attributes carried over by a snapshot, where the station has them
+STATION_FIELDS = ('status', 'parts', 'sheets', 'boxes', 'cycles', 'failures')
+#Containers private to a station (thermoformer oven and mold, load station sheets), carried over by level
+STATION_CONTAINERS = ('oven_stock', 'mold_stock', 'capacity')
+#`Breakdowns` state carried over for machines that can break down, including a repair in progress
+BREAKDOWN_FIELDS = ('count', 'downtime', 'down_since', 'down_until')
+
+#Snapshot of the warmed-up cell inherited by forked sweep workers; only set while `forked_sweep()` is running
+_WARM_SNAPSHOT = None
+
+
+class Cell_Snapshot(object):
+	#Plain-data, picklable copy of a running cell: time, buffer and container levels, station counters, breakdown
+	#	state and generator states. `restore()` builds a fresh cell that carries on from it; steps part way
+	#	through start over, while a repair in progress carries on to the time it was due to finish.
+
+	def __init__(self, cell):
+		self.time = cell.env.now
+		self.config = cell.config
+		self.topology = cell.topology
+		self.levels = {name: buffer.level for name, buffer in cell.buffers.items()}
+		self.stations = {}
+		for name, station in cell.stations.items():
+			fields = {field: getattr(station, field) for field in STATION_FIELDS if hasattr(station, field)}
+			containers = {attr: getattr(station, attr).level for attr in STATION_CONTAINERS if hasattr(station, attr)}
+			self.stations[name] = (fields, containers, copy.deepcopy(station.generators))
+		self.breakdowns = {}
+		for name, station in cell.stations.items():
+			breakdowns = getattr(station, 'breakdowns', None)
+			if breakdowns is not None and breakdowns.rng is not None:
+				fields = {field: getattr(breakdowns, field) for field in BREAKDOWN_FIELDS}
+				self.breakdowns[name] = (fields, copy.deepcopy(breakdowns.rng))
+		self.rng = copy.deepcopy(cell.rng)
+
+	def restore(self, config=None, trace=None):
+		if config is None:
+			config = self.config
+		env = simpy.Environment(initial_time=self.time)
+		cell = self.topology.build(env, config, copy.deepcopy(self.rng), trace=trace, levels=self.levels)
+		for name, (fields, containers, generators) in self.stations.items():
+			station = cell.stations[name]
+			for field, value in fields.items():
+				setattr(station, field, value)
+			for attr, level in containers.items():
+				setattr(station, attr, simpy.Container(env, getattr(station, attr).capacity, init=level))
+			station.generators = copy.deepcopy(generators)
+			station.configure(config)
+		for name, (fields, rng) in self.breakdowns.items():
+			breakdowns = cell.stations[name].breakdowns
+			for field, value in fields.items():
+				setattr(breakdowns, field, value)
+			breakdowns.rng = copy.deepcopy(rng)
+			breakdowns.configure(breakdowns.mtbf, breakdowns.mttr)
+		return cell
+
+
+def measure(cell, config, window):
+	#Runs a warmed-up cell for `window` more seconds under `config` and scores it like a full-length run
+	cell.reconfigure(config)
+	cell.reset_metrics()
+	start_pieces = cell.pieces()
+	start_failures = cell.failures()
+	cell.run(until=cell.env.now + window)
+	scale = config.SIMULATION_TIME / window
+	pcs = (cell.pieces() - start_pieces) * scale
+	failures = (cell.failures() - start_failures) * scale
+	return Setting(config.THERMOFORMER_RUNTIME, config.annual_cost(pcs), pcs, cell.wip(), failures, sim_time=config.SIMULATION_TIME)
+
+
+def _run_forked(config, window):
+	#Runs in a forked pool worker, which inherits the parent's snapshot rather than unpickling it per point
+	return _run_restored(_WARM_SNAPSHOT, config, window)
+
+
+def _run_restored(snapshot, config, window):
+	return measure(snapshot.restore(config), config, window)
+
+
+def forked_sweep(min_cycle, max_cycle, steps, config=None, seed=None, topology=None, warmup=10000, workers=1):
+	#Sweeps the cycle time like `cost_sim()`, but simulates the start-up only once: every point restores the
+	#	same `Cell_Snapshot` taken after `warmup` seconds, whatever the number of `workers`. Returns the best
+	#	`Setting` and the `Setting` of every point in sweep order.
+	global _WARM_SNAPSHOT
+	if config is None:
+		config = SimConfig()
+	configs = [config.replace(THERMOFORMER_RUNTIME=cycle) for cycle in sweep_cycles(min_cycle, max_cycle, steps)]
+	window = config.SIMULATION_TIME - warmup
+	cell = build_cell(config, seed, topology)
+	cell.run(until=warmup)
+	snapshot = Cell_Snapshot(cell)
+
+	if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+		_WARM_SNAPSHOT = snapshot
+		try:
+			with multiprocessing.get_context('fork').Pool(workers) as pool:
+				settings = pool.starmap(_run_forked, zip(configs, repeat(window)))
+		finally:
+			_WARM_SNAPSHOT = None
+	elif workers > 1:
+		with ProcessPoolExecutor(max_workers=workers) as executor:
+			settings = list(executor.map(_run_restored, repeat(snapshot), configs, repeat(window)))
+	else:
+		settings = [_run_restored(snapshot, c, window) for c in configs]
+
+	best_setting = max(settings, key=lambda setting: setting.cost_factor)
+	best_setting.print_out()
+	return best_setting, settings
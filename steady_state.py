@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from .constants import SimConfig
+from .metrics import Cell_Metrics
+from .replication import Estimate
+from .tesla import build_cell, Setting
+
+
+
+def mser_truncation(series, batch_size=5):
+	#MSER-m warm-up truncation: the number of leading observations to drop so that the remaining batch means
+	#	have the smallest marginal standard error. Only the first half of the series is considered, so a result
+	#	at (or near) that limit means the run has not settled yet.
+	values = np.asarray(series, dtype=np.float64)
+	n = len(values) // batch_size
+	if n < 2:
+		return 0
+	batches = values[:n * batch_size].reshape(n, batch_size).mean(axis=1)
+	remaining = np.arange(n, 0, -1)
+	sums = np.cumsum(batches[::-1])[::-1]
+	squares = np.cumsum((batches ** 2)[::-1])[::-1]
+	statistic = (squares - sums ** 2 / remaining) / remaining ** 2
+	return int(np.argmin(statistic[:n // 2 + 1])) * batch_size
+
+
+class Steady_State_Result(object):
+	#Steady-state rates from `steady_state_run()`, scaled to a full `SIMULATION_TIME` run so they plug into
+	#	the same cost model as `main()`
+
+	def __init__(self, config, warmup, elapsed, pieces, failures, wip, metrics, converged):
+		self.config = config
+		self.warmup = warmup
+		self.elapsed = elapsed
+		self.pieces = pieces
+		self.failures = failures
+		self.wip = wip
+		self.metrics = metrics
+		self.converged = converged
+
+	def setting(self):
+		setting = Setting(self.config.THERMOFORMER_RUNTIME, self.config.annual_cost(self.pieces.mean), self.pieces.mean,
+						  self.wip, self.failures.mean, sim_time=self.config.SIMULATION_TIME)
+		setting.simulated_time = self.elapsed
+		return setting
+
+
+def steady_state_run(config=None, seed=None, topology=None, interval=900, batches=10, min_intervals=20,
+					 precision=0.02, max_time=None):
+	#Runs the cell `interval` seconds at a time, resets its metrics once MSER-5 finds the end of the warm-up,
+	#	and stops once the post-warm-up rate is within `precision` or at `max_time` (`config.SIMULATION_TIME`).
+	if config is None:
+		config = SimConfig()
+	if max_time is None:
+		max_time = config.SIMULATION_TIME
+	scale = config.SIMULATION_TIME / interval
+	cell = build_cell(config, seed, topology)
+	pieces = []
+	failures = []
+	last_pieces = last_failures = 0
+	metrics_reset = False
+	converged = False
+
+	while cell.env.now + interval <= max_time:
+		cell.run(until=cell.env.now + interval)
+		total_pieces = cell.pieces()
+		total_failures = cell.failures()
+		pieces.append(total_pieces - last_pieces)
+		failures.append(total_failures - last_failures)
+		last_pieces, last_failures = total_pieces, total_failures
+		if len(pieces) < min_intervals:
+			continue
+
+		warmup = mser_truncation(pieces)
+		if warmup >= len(pieces) // 2:
+			continue
+		if not metrics_reset:
+			cell.reset_metrics()
+			metrics_reset = True
+		steady = len(pieces) - warmup
+		if steady < batches:
+			continue
+		size = steady // batches
+		start = len(pieces) - size * batches
+		rates = np.asarray(pieces[start:]).reshape(batches, size).mean(axis=1) * scale
+		if Estimate(rates.tolist()).relative_half_width() <= precision:
+			converged = True
+			break
+
+	warmup = mser_truncation(pieces)
+	steady = max(1, len(pieces) - warmup)
+	size = max(1, steady // batches)
+	start = len(pieces) - size * min(batches, steady)
+	piece_rates = (np.asarray(pieces[start:]).reshape(-1, size).mean(axis=1) * scale).tolist()
+	failure_rates = (np.asarray(failures[start:]).reshape(-1, size).mean(axis=1) * scale).tolist()
+	return Steady_State_Result(config, warmup * interval, cell.env.now, Estimate(piece_rates), Estimate(failure_rates),
+							   cell.wip(), Cell_Metrics(cell), converged)
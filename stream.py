@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import os
+import pickle
+from .snapshot import Cell_Snapshot
+from .tesla import build_cell
+
+
+
+class Chunk(object):
+	#KPIs at the end of one chunk of a `stream_run()`. `pieces`, `failures` and `mean_rate` cover the whole run
+	#	so far; the `chunk_` counts and `rate` (parts/hr) cover just this chunk.
+
+	def __init__(self, cell, index, chunk_time, chunk_pieces, chunk_failures):
+		self.index = index
+		self.time = cell.env.now
+		self.pieces = cell.pieces()
+		self.failures = cell.failures()
+		self.wip = cell.wip()
+		self.chunk_pieces = chunk_pieces
+		self.chunk_failures = chunk_failures
+		self.rate = chunk_pieces / chunk_time * 3600 if chunk_time else 0.0
+		self.mean_rate = self.pieces / self.time * 3600 if self.time else 0.0
+
+	def print_out(self):
+		print('{0:8.1f}hr  {1:7} pcs  {2:6} failures  {3:4} WIP  {4:6.1f} pcs/hr this chunk, {5:6.1f} overall'.format(
+			self.time / 3600, self.pieces, self.failures, self.wip, self.rate, self.mean_rate))
+
+
+def save_checkpoint(cell, path):
+	#Writes a `Cell_Snapshot` of `cell` to `path`. The file is replaced in one step, so a crash mid-write leaves
+	#	the previous checkpoint intact.
+	temporary = path + '.tmp'
+	with open(temporary, 'wb') as f:
+		pickle.dump(Cell_Snapshot(cell), f, protocol=pickle.HIGHEST_PROTOCOL)
+	os.replace(temporary, path)
+
+
+def load_checkpoint(path):
+	with open(path, 'rb') as f:
+		return pickle.load(f)
+
+
+class Stream_Run(object):
+	#Runs the cell `chunk` seconds at a time, yielding a `Chunk` after each, until `until`, `pieces` parts or a
+	#	year's volume (`config.EAU`). With `checkpoint` a `Cell_Snapshot` is saved every `checkpoint_every`
+	#	chunks, at the end and on `close()`; `resume` carries on from it.
+
+	def __init__(self, config=None, seed=None, topology=None, chunk=3600, until=None, pieces=None, checkpoint=None,
+				 checkpoint_every=24, resume=True):
+		if checkpoint is not None and resume and os.path.exists(checkpoint):
+			snapshot = load_checkpoint(checkpoint)
+			self.cell = snapshot.restore(snapshot.config if config is None else config)
+		else:
+			self.cell = build_cell(config, seed, topology)
+		if until is None and pieces is None:
+			pieces = self.cell.config.EAU
+		self.chunk = chunk
+		self.until = until
+		self.pieces = pieces
+		self.checkpoint = checkpoint
+		self.checkpoint_every = checkpoint_every
+		self.index = 0
+		self.finished = False
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		cell = self.cell
+		if self.finished or not ((self.until is None or cell.env.now < self.until)
+								 and (self.pieces is None or cell.pieces() < self.pieces)):
+			if not self.finished:
+				self.finished = True
+				self.close()
+			raise StopIteration
+		start_time = cell.env.now
+		start_pieces = cell.pieces()
+		start_failures = cell.failures()
+		end = start_time + self.chunk if self.until is None else min(self.until, start_time + self.chunk)
+		cell.run(until=end)
+		self.index += 1
+		if self.checkpoint is not None and self.index % self.checkpoint_every == 0:
+			self.save()
+		return Chunk(cell, self.index, cell.env.now - start_time, cell.pieces() - start_pieces, cell.failures() - start_failures)
+
+	def save(self):
+		#Checkpoints the cell as it is now. Returns False, leaving the file alone, when it already holds a
+		#	checkpoint from later in the run.
+		if os.path.exists(self.checkpoint) and load_checkpoint(self.checkpoint).time > self.cell.env.now:
+			return False
+		save_checkpoint(self.cell, self.checkpoint)
+		return True
+
+	def close(self):
+		if self.checkpoint is not None:
+			self.save()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		self.close()
+
+
+def stream_run(config=None, seed=None, topology=None, chunk=3600, until=None, pieces=None, checkpoint=None,
+			   checkpoint_every=24, resume=True):
+	#A `Stream_Run` of the cell, to iterate over chunk by chunk; see `Stream_Run` for the arguments
+	return Stream_Run(config, seed, topology, chunk, until, pieces, checkpoint, checkpoint_every, resume)
@@ -1,86 +1,103 @@
 #!/usr/bin/env python3
 
+import os
+import struct
 import simpy
-from .equipment import Operator, Sheeter, Thermoformer, Load_Station, Splitter, Router, Hotwire_Trimmer, Driller, Boxer 
-from .constants import G
-from .plotting import cost_plot
+from itertools import repeat
+from numpy.random import SeedSequence, default_rng
+from .constants import G, SimConfig
+from .equipment import Common_Streams
+from .metrics import Cell_Metrics, Level_Sampler
+from .results import Results_Table
+from .topology import compile_topology
 
 
 
-def main(user_input=False):
-	#Environment
-	env = simpy.Environment()
+def build_cell(config=None, seed=None, topology=None, trace=None, user_input=False, env=None):
+	#Builds a ready-to-run `topology.Cell` for `config`; see `main()` for the arguments.
+	#	`env` replaces the fresh `simpy.Environment`, e.g. with a `profiling.Profiling_Environment`.
+	if config is None:
+		config = SimConfig()
+	seed = config.SEED if seed is None else seed
+	rng = Common_Streams(seed) if config.COMMON_RANDOM_NUMBERS else default_rng(seed)
+	if env is None:
+		env = simpy.Environment()
+	return compile_topology(topology).build(env, config, rng, user_input=user_input or config.USER_INPUT, trace=trace)
 
-	#Operators
-	main_ops = Operator(env, G.MAIN_OPERATORS)
-	sup_ops = Operator(env, G.SUPPORT_OPERATORS)
 
-	#Containers
-	formed_sheet_stock = simpy.Container(env, G.FORMED_SHEET_STOCK_SIZE, init=0)
-	split_formed_stock = simpy.Container(env, G.SPLIT_FORMED_STOCK_SIZE, init=0)
-	routed_part_stock = simpy.Container(env, G.ROUTED_PART_STOCK_SIZE, init=0)
-	trimmed_part_stock = simpy.Container(env, G.TRIMMED_PART_STOCK_SIZE, init=0)
-	raw_sheet_stock = simpy.Container(env, G.RAW_SHEET_STOCK_SIZE, init=0)
-	finished_part_stock = simpy.Container(env, G.FINISHED_PART_STOCK_SIZE, init=0)
-	box = simpy.Container(env, G.BOX_SIZE, init=0)
-
-	#Thermoformers
-	station = simpy.PreemptiveResource(env, capacity=1)
-	load_station_one = Load_Station('Load Station 1', env, main_ops, station, raw_sheet_stock, formed_sheet_stock, user_input=G.USER_INPUT)
-	thermoformer_one = Thermoformer('Thermoformer 1', env, station, load_station_one, user_input=G.USER_INPUT)
-
-	#Formed sheet splitting operation
-	splitting_one = Splitter('Splitter 1', env, main_ops, formed_sheet_stock, split_formed_stock, user_input=G.USER_INPUT)
-		
-	#Automatic Sheeters
-	sheeter_one = Sheeter('Sheeter 1', env, main_ops, raw_sheet_stock, user_input=G.USER_INPUT)
+class Run_Result(object):
+	#Outcome of a single `simulate()` run, with the station, operator and buffer statistics in `metrics`
+	def __init__(self, pieces, failures, wip, metrics, levels=None):
+		self.pieces = pieces
+		self.failures = failures
+		self.wip = wip
+		self.metrics = metrics
+		self.levels = levels
 
-	#Robotic Routers
-	router_one = Router('Router 1', env, main_ops, split_formed_stock, routed_part_stock, user_input=G.USER_INPUT)
-	router_two = Router('Router 2', env, sup_ops, split_formed_stock, routed_part_stock, user_input=G.USER_INPUT)
-	router_three = Router('Router 3', env, sup_ops, split_formed_stock, routed_part_stock, user_input=G.USER_INPUT)
 
-	#Hotwire Trimmer
-	trimmer_one = Hotwire_Trimmer('Hotwire trimmer 1', env, sup_ops, routed_part_stock, trimmed_part_stock, user_input=G.USER_INPUT)
+def simulate(config=None, seed=None, topology=None, trace=None, sample_interval=None):
+	#Runs the work cell once like `main()`, but returns a `Run_Result` with the full instrumentation.
+	#	With `sample_interval` set, container levels are also sampled into `Run_Result.levels`.
+	cell = build_cell(config, seed, topology, trace)
+	sampler = Level_Sampler.for_cell(cell, sample_interval) if sample_interval else None
+	cell.run()
+	levels = sampler.series() if sampler is not None else None
+	return Run_Result(cell.pieces(), cell.failures(), cell.wip(), Cell_Metrics(cell), levels)
 
-	#Driller
-	driller_one = Driller('Driller 1', env, sup_ops, trimmed_part_stock, finished_part_stock, user_input=G.USER_INPUT)
 
-	#Boxer
-	boxer_one = Boxer('Boxer 1', env, sup_ops, finished_part_stock, box, user_input=G.USER_INPUT)
+def main(user_input=False, config=None, seed=None, topology=None, trace=None, profile=False):
+	#Runs the work cell once with the parameters in `config` (a `SimConfig`, built from `G` when omitted), seeded
+	#	with `seed` or `config.SEED`. `trace` takes an `event_trace.Event_Recorder`; `profile` prints where the
+	#	wall time went, and a file name also writes cProfile stats there.
+	if config is None:
+		config = SimConfig()
+	user_input = user_input or config.USER_INPUT
+	if profile:
+		from .profiling import Profiling_Environment, profile_run
+		cell = build_cell(config, seed, topology, trace, user_input, env=Profiling_Environment())
+		report = profile_run(cell, cprofile=None if profile is True else profile)
+	else:
+		cell = build_cell(config, seed, topology, trace, user_input)
 
-	#Run the simulation environment
-	env.run(until=G.SIMULATION_TIME)
+		#Run the simulation environment
+		cell.run()
 	
-	wip = formed_sheet_stock.level * 2 + split_formed_stock.level + routed_part_stock.level + trimmed_part_stock.level + finished_part_stock.level
+	wip = cell.wip()
+	pieces = cell.pieces()
+	failures = cell.failures()
 	
 	#Generic summary report
-	if G.USER_INPUT == True:
+	if user_input == True:
 		print('\n\nResults:')
-		print('{0} produced {1} sheets'.format(sheeter_one.name, sheeter_one.sheets))
-		print('{0} produced {1} parts'.format(router_one.name, router_one. parts))
-		print('{0} produced {1} parts'.format(router_two.name, router_two. parts))
-		print('{0} produced {1} parts'.format(router_three.name, router_three. parts))
-		print('{0} produced {1} parts'.format(trimmer_one.name, trimmer_one.parts))
-		print('{0} produced {1} parts'.format(driller_one.name, driller_one.parts))
-		print('{0} produced {1} boxes'.format(boxer_one.name, boxer_one.boxes))
-		print('{0} missed {1} of {2} total cycles'.format(thermoformer_one.name, 
-				 thermoformer_one.failures, thermoformer_one.cycles))
+		for sheeter in cell.of_type('sheeter'):
+			print('{0} produced {1} sheets'.format(sheeter.name, sheeter.sheets))
+		for station in cell.of_type('router', 'hotwire_trimmer', 'driller'):
+			print('{0} produced {1} parts'.format(station.name, station.parts))
+		for boxer in cell.of_type('boxer'):
+			print('{0} produced {1} boxes'.format(boxer.name, boxer.boxes))
+		for thermoformer in cell.of_type('thermoformer'):
+			print('{0} missed {1} of {2} total cycles'.format(thermoformer.name, 
+					 thermoformer.failures, thermoformer.cycles))
 		print('{0} parts as WIP still in cell'.format(wip))
-		print('Effecitve cycle: {0: .1f}s, Average production rate: {1: .1f} parts/hr'.format(G.SIMULATION_TIME
-				  / max(1, (driller_one.parts / 2)), driller_one.parts / (G.SIMULATION_TIME / 3600)))
+		print('Effecitve cycle: {0: .1f}s, Average production rate: {1: .1f} parts/hr'.format(config.SIMULATION_TIME
+				  / max(1, (pieces / 2)), pieces / config.SIMULATION_HOURS))
+		Cell_Metrics(cell).print_out()
+	if profile:
+		report.print_out()
 	
-	return driller_one.parts, thermoformer_one.failures, wip
+	return pieces, failures, wip
 
 
 class Setting(object):
 	#Used to store run setting and result information from a particular simulation
-	def __init__(self, cycle, cost, pcs, wip, failures):
+	def __init__(self, cycle, cost, pcs, wip, failures, sim_time=G.SIMULATION_TIME):
 		self.cost = cost
 		self.pcs = pcs
 		self.wip = wip
 		self.failures = failures
 		self.cycle = cycle
+		self.sim_time = sim_time
+		self.replications = 1
 		self.cost_factor = 0
 		self.get_cost_factor()
 
@@ -97,45 +114,171 @@ class Setting(object):
 	Annual cost to run: {2: .0f}
 	Pieces produced: {3}
 	Cycle failures: {4}
-	Remaining WIP in the cell: {5}""".format(G.SIMULATION_TIME, self.cycle, self.cost, self.pcs, self.failures, self.wip))
-
-
-def cost_sim(min_cycle, max_cycle, steps, user_input=False):
-	MIN_CYCLE = min_cycle
-	G.THERMOFORMER_RUNTIME = max_cycle
-	STEP_COUNT = steps
-	STEP_SIZE = (G.THERMOFORMER_RUNTIME - MIN_CYCLE) / 100
-	cycle_times_arr = []
-	pcs_arr = []
-	failures_arr = []
-	wip_arr = []
-	cost_arr = []
-	best_setting = Setting(0, 0, 0, 0, 0)
-	labor_cost = G.SIMULATION_TIME / 3600 * (G.MACHINE_RATE + G.OVERHEAD_RATE 
-						+ (G.MAIN_OPERATORS + G.SUPPORT_OPERATORS) * G.OPERATOR_RATE)
+	Remaining WIP in the cell: {5}""".format(self.sim_time, self.cycle, self.cost, self.pcs, self.failures, self.wip))
+
+
+def sweep_cycles(min_cycle, max_cycle, steps):
+	#Thermoformer cycle times visited by `cost_sim`, stepping down from `max_cycle` towards `min_cycle`. They are
+	#	rounded so that sweeps with different step sizes land on exactly the same value where they overlap.
+	step_size = (max_cycle - min_cycle) / steps
+	return [round(max_cycle - i * step_size, 9) for i in range(steps)]
+
+
+def point_seed(seed, cycle):
+	#Seed of the sweep point at `cycle`, taken from the sweep's `seed` and the cycle time itself, so a cycle
+	#	time gets the same seed in every sweep that visits it however the sweep is laid out
+	bits = int.from_bytes(struct.pack('<d', cycle), 'little')
+	return int(SeedSequence([seed, bits]).generate_state(1)[0])
+
+
+def run_point(config, point_seed=None, replications=1, precision=0.01, topology=None, steady_state=False, threshold=None):
+	#Runs and scores a single sweep point; kept at module level so process pool workers can unpickle it.
+	#	With `replications` > 1 the point is replicated until its estimates are within `precision`, or until
+	#	its cost_factor is clearly below `threshold`, e.g. the best seen so far.
+	#	With `steady_state` the warm-up is cut off and the run stops once its rates settle instead.
+	if steady_state and replications > 1:
+		raise ValueError('steady_state runs one run per point, so it can\'t be combined with replications > 1')
+	if steady_state:
+		from .steady_state import steady_state_run
+		return steady_state_run(config, point_seed, topology).setting()
+	if replications > 1:
+		return replicate_point(config, point_seed, replications, precision, topology, threshold).setting()
+	pcs, failures, wip = main(config=config, seed=point_seed, topology=topology)
+	return Setting(config.THERMOFORMER_RUNTIME, config.annual_cost(pcs), pcs, wip, failures, sim_time=config.SIMULATION_TIME)
+
+
+def replicate_point(config, point_seed=None, replications=1, precision=0.01, topology=None, threshold=None, start=None):
+	#`replication.replicate()` for one sweep point, returning the full `Replication_Result`
+	from .replication import replicate
+	return replicate(config, seed=point_seed, max_replications=replications, precision=precision, threshold=threshold,
+					 topology=topology, start=start)
+
+
+def _point_pool(workers):
+	#Process pool for the sweep points when `workers` > 1, otherwise None to run them in this process
+	if workers > 1:
+		from concurrent.futures import ProcessPoolExecutor
+		return ProcessPoolExecutor(max_workers=workers)
+	return None
+
+
+def _map_points(function, workers, *args, executor=None):
+	#Maps `function` over sweep points: in `executor`, or a process pool of its own when `workers` > 1,
+	#	otherwise lazily in this process
+	if executor is not None:
+		return list(executor.map(function, *args, chunksize=max(1, len(args[0]) // (workers * 4))))
+	if workers > 1:
+		with _point_pool(workers) as executor:
+			return _map_points(function, workers, *args, executor=executor)
+	return map(function, *args)
+
+
+def cost_sim(min_cycle, max_cycle, steps, user_input=False, workers=1, seed=None, config=None, replications=1, precision=0.01, topology=None, steady_state=False,
+			 cache=None, screen_margin=None, plot=True, table=None, shard=None, race=None):
+	#Sweeps the thermoformer cycle time and returns the best `Setting`. Each point is seeded from `seed` and its
+	#	cycle time, so `workers`, `shard` and `cache` never change a point's result; see the README for the options.
+	if steady_state and replications > 1:
+		raise ValueError('steady_state runs one run per point, so it can\'t be combined with replications > 1')
+	if config is None:
+		config = SimConfig()
+	topology = compile_topology(topology)
+	cycles = sweep_cycles(min_cycle, max_cycle, steps)
+	configs = [config.replace(THERMOFORMER_RUNTIME=cycle) for cycle in cycles]
+	if config.COMMON_RANDOM_NUMBERS:
+		point_seeds = [config.SEED if seed is None else seed] * steps
+	else:
+		point_seeds = [point_seed(config.SEED if seed is None else seed, cycle) for cycle in cycles]
+	sweep = Results_Table(capacity=steps)
+	settings = []
+	
+	if cache is not None:
+		keys = [cache.key(c, s, replications, precision, topology, steady_state) for c, s in zip(configs, point_seeds)]
+		cached = cache.get_many(keys)
+	else:
+		cached = [None] * steps
+	if screen_margin is not None:
+		from .screen import screen
+		passed = [result.passed for result in screen(configs, screen_margin, topology=topology)]
+	else:
+		passed = [True] * steps
+	indices = range(steps) if shard is None else range(shard[0], steps, shard[1])
+	todo = [i for i in indices if cached[i] is None and passed[i]]
+	todo_configs = [configs[i] for i in todo]
+	todo_seeds = [point_seeds[i] for i in todo]
+	if race is None:
+		race = shard is None
+	workers = workers if todo else 1
+	
+	keep = repeat(True)
+	if race and replications > 1 and not steady_state and todo:
+		#Both rounds share one pool, so its start-up is only paid once
+		executor = _point_pool(workers)
+		try:
+			first = list(_map_points(replicate_point, workers, todo_configs, todo_seeds, repeat(min(3, replications)), repeat(precision),
+									 repeat(topology), executor=executor))
+			threshold = max([result.cost_factor.mean for result in first] + [cached[i].cost_factor for i in indices if cached[i] is not None])
+			raced = list(_map_points(replicate_point, workers, todo_configs, todo_seeds, repeat(replications), repeat(precision),
+									 repeat(topology), repeat(threshold), first, executor=executor))
+		finally:
+			if executor is not None:
+				executor.shutdown()
+		results = [result.setting() for result in raced]
+		#Points cut short depend on the rest of the sweep, so they aren't cached
+		keep = [not result.below_threshold for result in raced]
+	else:
+		results = _map_points(run_point, workers, todo_configs, todo_seeds, repeat(replications), repeat(precision), repeat(topology), repeat(steady_state))
+	results = iter(results)
+	keep = iter(keep)
 	
-	for i in range(STEP_COUNT):
-		pcs, failures, wip = main()
-		pcs_arr.append(pcs)
-		failures_arr.append(failures)
-		wip_arr.append(wip)
-		cycle_times_arr.append(G.THERMOFORMER_RUNTIME)
-		run_cost = pcs * (G.SHEET_COST + G.BOX_COST) + labor_cost
-		annual_cost = G.EAU / max(1, pcs) * run_cost
-		cost_arr.append(annual_cost)
-		new_setting = Setting(G.THERMOFORMER_RUNTIME, annual_cost, pcs, wip, failures)
-		if new_setting.cost_factor > best_setting.cost_factor:
-			best_setting = new_setting
+	for i in indices:
+		if not passed[i]:
+			print("Run {0} of {1},  screened out".format(i, steps))
+			continue
+		new_setting = cached[i]
+		if new_setting is None:
+			new_setting = next(results)
+			if next(keep) and cache is not None:
+				cache.put(keys[i], new_setting)
+		sweep.append(new_setting, configs[i])
+		settings.append(new_setting)
+		if table is not None:
+			table.append(new_setting, configs[i])
 		
-		print("Run {0} of {1},  run_cost: {2} pcs: {3}".format(i, STEP_COUNT, run_cost, pcs))
-		G.THERMOFORMER_RUNTIME -= STEP_SIZE
+		print("Run {0} of {1},  run_cost: {2} pcs: {3} ({4} replications)".format(i, steps, 
+				config.run_cost(new_setting.pcs), new_setting.pcs, new_setting.replications))
 		
+	best = sweep.best() if len(sweep) else None
+	if best is not None and sweep['cost_factor'][best] > 0:
+		best_setting = settings[best]
+	else:
+		best_setting = Setting(0, 0, 0, 0, 0, sim_time=config.SIMULATION_TIME)
 	best_setting.print_out()
-	title = "Tesla Monark Simulation Results (3 Oprs, 3 Robots) - Ideal Rate: {0: 0.0f}s, Annual Cost: ${1: 0.0f}".format(best_setting.cycle, best_setting.cost)
-	cost_plot(cycle_times_arr, cost_arr, pcs_arr, failures_arr, wip_arr, best_setting.cycle, title=title)
+	title = "Tesla Monark Simulation Results ({2} Oprs, {3} Robots) - Ideal Rate: {0: 0.0f}s, Annual Cost: ${1: 0.0f}".format(best_setting.cycle, 
+				best_setting.cost, config.MAIN_OPERATORS + config.SUPPORT_OPERATORS, config.ROUTERS)
+	if plot:
+		from .plotting import cost_plot
+		cost_plot(sweep['cycle'], sweep['cost'], sweep['pcs'], sweep['failures'], sweep['wip'], best_setting.cycle, title=title, sim_time=config.SIMULATION_TIME,
+				  path=None if plot is True else plot)
 	
 	return best_setting
-		
+
+
+
+def plot_name(config):
+	#File name for a sweep's figure, in the style of the ones in plots/
+	name = '{0} oprs {1} robots'.format(config.MAIN_OPERATORS + config.SUPPORT_OPERATORS, config.ROUTERS)
+	if config.SHEETERS > 1:
+		name += ' {0} sheeters'.format(config.SHEETERS)
+	return name + ' cost function.png'
+
+
+def export_sweeps(configs, min_cycle, max_cycle, steps, directory='plots', **options):
+	#Runs `cost_sim()` for each config and writes every sweep's figure to `directory` without a display, named
+	#	by `plot_name()`. `options` are passed on to `cost_sim()`. Returns the best `Setting` of each sweep.
+	os.makedirs(directory, exist_ok=True)
+	return [cost_sim(min_cycle, max_cycle, steps, config=config, plot=os.path.join(directory, plot_name(config)), **options)
+			for config in configs]
+
 
 if __name__ == '__main__':
 	best_setting = cost_sim(45, G.THERMOFORMER_RUNTIME, 100)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+#The repository is the `tesla` package: import it from its parent directory, not as the loose modules of
+#	the checkout, where `tesla` would be `tesla.py`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:] = [path for path in sys.path if os.path.abspath(path or os.curdir) != ROOT]
+sys.path.insert(0, os.path.dirname(ROOT))
@@ -0,0 +1,62 @@
+#Invariants the sweep machinery promises, checked on short runs: how a sweep is run (workers, shards, cache,
+#	forking) never changes its results, and re-scoring at unchanged prices is exact.
+import pytest
+from tesla.cache import Result_Cache
+from tesla.constants import SimConfig
+from tesla.results import Results_Table, merge_results
+from tesla.snapshot import forked_sweep
+from tesla.tesla import cost_sim
+
+
+
+CONFIG = SimConfig(SIMULATION_TIME=3000)
+STEPS = 4
+
+
+def _sweep(config=CONFIG, **options):
+	#Rows of a short `cost_sim()` sweep, in descending cycle time order
+	table = Results_Table(capacity=STEPS)
+	cost_sim(50, 80, STEPS, config=config, plot=False, table=table, **options)
+	return merge_results([table]).rows.tolist()
+
+
+@pytest.mark.parametrize('common_random_numbers', [False, True])
+def test_parallel_sweep_matches_serial(common_random_numbers):
+	config = CONFIG.replace(COMMON_RANDOM_NUMBERS=common_random_numbers)
+	assert _sweep(config, workers=2) == _sweep(config, workers=1)
+
+
+def test_merged_shards_match_unsharded_sweep():
+	shards = []
+	for i in range(2):
+		table = Results_Table(capacity=STEPS)
+		cost_sim(50, 80, STEPS, config=CONFIG, plot=False, table=table, shard=(i, 2))
+		shards.append(table)
+	assert merge_results(shards).rows.tolist() == _sweep()
+
+
+def test_cache_hits_match_fresh_runs(tmp_path):
+	cache = Result_Cache(str(tmp_path / 'results.sqlite'))
+	try:
+		stored = _sweep(cache=cache)
+		assert cache.hits == 0
+		cached = _sweep(cache=cache)
+		assert cache.hits == STEPS
+	finally:
+		cache.close()
+	assert cached == stored == _sweep()
+
+
+def test_reweight_at_unchanged_prices_is_exact():
+	table = Results_Table(capacity=STEPS)
+	cost_sim(50, 80, STEPS, config=CONFIG, plot=False, table=table, replications=3, race=False)
+	assert (table['replications'] > 1).all()
+	assert table.reweight().rows.tolist() == table.rows.tolist()
+	assert table.reweight(OPERATOR_RATE=2 * table.prices['OPERATOR_RATE']).rows.tolist() != table.rows.tolist()
+
+
+def test_forked_sweep_does_not_depend_on_workers():
+	config = CONFIG.replace(SIMULATION_TIME=6000)
+	serial = forked_sweep(50, 80, 3, config, warmup=2000, workers=1)[1]
+	parallel = forked_sweep(50, 80, 3, config, warmup=2000, workers=2)[1]
+	assert [vars(setting) for setting in parallel] == [vars(setting) for setting in serial]
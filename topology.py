@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+import json
+from functools import lru_cache
+import simpy
+from .equipment import Common_Streams, Operator, Buffer, Sheeter, Thermoformer, Load_Station, Splitter, Router, Hotwire_Trimmer, Driller, Boxer
+
+
+
+#Equipment classes that can be placed in a topology, keyed by the `type` used in the spec
+STATION_TYPES = {
+	'sheeter': Sheeter,
+	'load_station': Load_Station,
+	'thermoformer': Thermoformer,
+	'splitter': Splitter,
+	'router': Router,
+	'hotwire_trimmer': Hotwire_Trimmer,
+	'driller': Driller,
+	'boxer': Boxer,
+}
+
+#Spec keys that wire a station up, and the equipment constructor argument each one fills
+CONNECTIONS = {
+	'operator': 'operator',
+	'resource': 'station',
+	'input': 'raw_stock',
+	'output': 'finished_stock',
+	'load_station': 'load_station',
+}
+
+#Capacities and counts may be given as numbers or as the name of a `SimConfig` constant.
+#	Stations with a `count` get their name formatted with a 1-based index, and an `operator` list
+#	assigns the pools in order with the last pool taking any remaining instances.
+DEFAULT_TOPOLOGY = {
+	'operators': {
+		'main': {'capacity': 'MAIN_OPERATORS'},
+		'support': {'capacity': 'SUPPORT_OPERATORS', 'fallback': 'main'},
+	},
+	'resources': {
+		'thermoformer_station': 1,
+	},
+	'buffers': {
+		'formed_sheet_stock': 'FORMED_SHEET_STOCK_SIZE',
+		'split_formed_stock': 'SPLIT_FORMED_STOCK_SIZE',
+		'routed_part_stock': 'ROUTED_PART_STOCK_SIZE',
+		'trimmed_part_stock': 'TRIMMED_PART_STOCK_SIZE',
+		'raw_sheet_stock': 'RAW_SHEET_STOCK_SIZE',
+		'finished_part_stock': 'FINISHED_PART_STOCK_SIZE',
+		'box': 'BOX_SIZE',
+	},
+	'stations': [
+		{'type': 'load_station', 'name': 'Load Station 1', 'operator': 'main', 'resource': 'thermoformer_station',
+		 'input': 'raw_sheet_stock', 'output': 'formed_sheet_stock'},
+		{'type': 'thermoformer', 'name': 'Thermoformer 1', 'resource': 'thermoformer_station', 'load_station': 'Load Station 1'},
+		{'type': 'splitter', 'name': 'Splitter 1', 'operator': 'main', 'input': 'formed_sheet_stock', 'output': 'split_formed_stock'},
+		{'type': 'sheeter', 'name': 'Sheeter {0}', 'count': 'SHEETERS', 'operator': 'main', 'output': 'raw_sheet_stock'},
+		{'type': 'router', 'name': 'Router {0}', 'count': 'ROUTERS', 'operator': ['main', 'support'],
+		 'input': 'split_formed_stock', 'output': 'routed_part_stock'},
+		{'type': 'hotwire_trimmer', 'name': 'Hotwire trimmer 1', 'operator': 'support', 'input': 'routed_part_stock', 'output': 'trimmed_part_stock'},
+		{'type': 'driller', 'name': 'Driller 1', 'operator': 'support', 'input': 'trimmed_part_stock', 'output': 'finished_part_stock'},
+		{'type': 'boxer', 'name': 'Boxer 1', 'operator': 'support', 'input': 'finished_part_stock', 'output': 'box'},
+	],
+	#Parts held in each buffer at the end of a run, per unit of buffer level
+	'wip': {
+		'formed_sheet_stock': 2,
+		'split_formed_stock': 1,
+		'routed_part_stock': 1,
+		'trimmed_part_stock': 1,
+		'finished_part_stock': 1,
+	},
+	'pieces': 'Driller 1',
+	'failures': 'Thermoformer 1',
+}
+
+
+def resolve(value, config):
+	#Numbers pass straight through; strings name a constant on `config`
+	if isinstance(value, str):
+		return getattr(config, value)
+	return value
+
+
+class Cell(object):
+	#A built work cell: the SimPy environment plus every operator pool, buffer and station from a `Topology`
+
+	def __init__(self, topology, env, config, rng):
+		self.topology = topology
+		self.env = env
+		self.config = config
+		self.rng = rng
+		self.operators = {}
+		self.resources = {}
+		self.buffers = {}
+		self.stations = {}
+		self.types = {}
+
+	def run(self, until=None):
+		self.env.run(until=self.config.SIMULATION_TIME if until is None else until)
+
+	def of_type(self, *types):
+		return [self.stations[name] for name, kind in self.types.items() if kind in types]
+
+	def pieces(self):
+		return self.stations[self.topology.pieces].parts
+
+	def failures(self):
+		return self.stations[self.topology.failures].failures
+
+	def wip(self):
+		return sum(self.buffers[name].level * weight for name, weight in self.topology.wip)
+
+	def reconfigure(self, config):
+		#Switches every station over to `config` mid-run; station and buffer counts can't change this way
+		self.config = config
+		for station in self.stations.values():
+			station.configure(config)
+
+	def reset_metrics(self):
+		#Clears the station, operator and buffer instrumentation, e.g. at the end of a warm-up period
+		for station in self.stations.values():
+			station.timer.reset()
+			if hasattr(station, 'breakdowns'):
+				station.breakdowns.reset()
+		for operator in set(self.operators.values()):
+			operator.reset_metrics()
+		for buffer in self.buffers.values():
+			buffer.reset_metrics()
+
+
+class Topology(object):
+	#Validated, immutable form of a topology spec. The station list expanded for a given set of counts is
+	#	kept, so building the same layout again only has to create the SimPy objects.
+
+	def __init__(self, spec):
+		#Canonical text of the spec, identifying the layout e.g. in result cache keys
+		self.fingerprint = json.dumps(spec, sort_keys=True)
+		self.operators = tuple((name, self._pool(pool)) for name, pool in spec['operators'].items())
+		self.resources = tuple(spec.get('resources', {}).items())
+		self.buffers = tuple(spec['buffers'].items())
+		self.wip = tuple(spec.get('wip', {}).items())
+		self.pieces = spec['pieces']
+		self.failures = spec['failures']
+		self.stations = tuple(tuple(sorted(station.items())) for station in spec['stations'])
+		self._plans = {}
+		self._validate()
+
+	@staticmethod
+	def _pool(pool):
+		if isinstance(pool, dict):
+			return (pool['capacity'], pool.get('fallback'))
+		return (pool, None)
+
+	def _validate(self):
+		operators = set(name for name, pool in self.operators)
+		resources = set(name for name, capacity in self.resources)
+		buffers = set(name for name, capacity in self.buffers)
+		for name, (capacity, fallback) in self.operators:
+			if fallback is not None and fallback not in operators:
+				raise ValueError('Operator pool {0} falls back to unknown pool {1}'.format(name, fallback))
+		for station in self.stations:
+			station = dict(station)
+			if station.get('type') not in STATION_TYPES:
+				raise ValueError('Unknown station type {0!r}'.format(station.get('type')))
+			unknown = set(station) - set(CONNECTIONS) - {'type', 'name', 'count'}
+			if unknown:
+				raise ValueError('Unknown keys for station {0}: {1}'.format(station['name'], ', '.join(sorted(unknown))))
+			pools = station.get('operator', [])
+			for pool in ([pools] if isinstance(pools, str) else pools):
+				if pool not in operators:
+					raise ValueError('Station {0} uses unknown operator pool {1}'.format(station['name'], pool))
+			if 'resource' in station and station['resource'] not in resources:
+				raise ValueError('Station {0} uses unknown resource {1}'.format(station['name'], station['resource']))
+			for key in ('input', 'output'):
+				if key in station and station[key] not in buffers:
+					raise ValueError('Station {0} uses unknown buffer {1}'.format(station['name'], station[key]))
+		for name, weight in self.wip:
+			if name not in buffers:
+				raise ValueError('WIP counts unknown buffer {0}'.format(name))
+
+	def plan(self, config):
+		#Station list with counts expanded for `config`: (type, name, connections) in creation order
+		counts = tuple(resolve(dict(station).get('count', 1), config) for station in self.stations)
+		if counts not in self._plans:
+			plan = []
+			for station, count in zip(self.stations, counts):
+				station = dict(station)
+				for i in range(count):
+					connections = {}
+					for key, argument in CONNECTIONS.items():
+						if key not in station:
+							continue
+						value = station[key]
+						if key == 'operator' and not isinstance(value, str):
+							value = value[min(i, len(value) - 1)]
+						connections[argument] = (key, value)
+					name = station['name'].format(i + 1) if 'count' in station else station['name']
+					plan.append((station['type'], name, connections))
+			self._plans[counts] = tuple(plan)
+		return self._plans[counts]
+
+	def build(self, env, config, rng, user_input=False, trace=None, levels=None):
+		#`rng` is either one generator shared by every station or `Common_Streams` giving each its own.
+		#	`levels` optionally gives the starting level of each buffer by name.
+		cell = Cell(self, env, config, rng)
+		for name, (capacity, fallback) in self.operators:
+			capacity = resolve(capacity, config)
+			if capacity > 0:
+				cell.operators[name] = Operator(env, capacity)
+		for name, (capacity, fallback) in self.operators:
+			if name not in cell.operators and fallback is not None:
+				cell.operators[name] = cell.operators[fallback]
+		for name, capacity in self.resources:
+			cell.resources[name] = simpy.PreemptiveResource(env, capacity=resolve(capacity, config))
+		for name, capacity in self.buffers:
+			cell.buffers[name] = Buffer(env, resolve(capacity, config), init=levels.get(name, 0) if levels else 0)
+
+		lookups = {'operator': cell.operators, 'resource': cell.resources, 'input': cell.buffers,
+				   'output': cell.buffers, 'load_station': cell.stations}
+		for kind, name, connections in self.plan(config):
+			kwargs = {argument: lookups[key][value] for argument, (key, value) in connections.items()}
+			station_rng = rng.station(name) if isinstance(rng, Common_Streams) else rng
+			cell.stations[name] = STATION_TYPES[kind](name, env, config, station_rng, user_input=user_input, trace=trace, **kwargs)
+			cell.types[name] = kind
+		return cell
+
+
+@lru_cache(maxsize=64)
+def _parse(text):
+	return Topology(json.loads(text))
+
+
+def compile_topology(spec=None):
+	#Parses a topology spec (a dict in the shape of `DEFAULT_TOPOLOGY`), reusing the parsed form for repeated specs
+	if isinstance(spec, Topology):
+		return spec
+	return _parse(json.dumps(DEFAULT_TOPOLOGY if spec is None else spec, sort_keys=True))
+
+
+def load_topology(path):
+	#Reads a topology spec from a JSON file, or YAML when PyYAML is installed and the file ends in .yaml/.yml
+	with open(path) as f:
+		text = f.read()
+	if path.endswith(('.yaml', '.yml')):
+		import yaml
+		return compile_topology(yaml.safe_load(text))
+	return _parse(json.dumps(json.loads(text), sort_keys=True))